@@ -0,0 +1,158 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``. Reads go to a healthy replica listed in
+settings.REPLICA_DATABASES unless the caller must see its own writes:
+
+* inside a transaction on the primary;
+* later in a request that has written, or in any unsafe (non-GET) request;
+* for REPLICA_STICKY_SECONDS after a client's last write, tracked by a
+  cookie for browsers and by a hash of the Authorization header for API
+  clients that don't send cookies.
+
+PrimaryStickinessMiddleware keeps that per-request state in a context
+variable, so it follows async views into their sync_to_async threads. A
+replica that fails to connect is skipped for REPLICA_RETRY_SECONDS.
+"""
+import hashlib
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = 'db_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+# alias -> time.monotonic() before which the replica is not retried
+_unhealthy_until = {}
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary, e.g. in scripts that read what they just wrote"""
+    token = _state.set(RoutingState(pinned=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def replica_is_healthy(alias):
+    retry_at = _unhealthy_until.get(alias)
+    if retry_at is not None and time.monotonic() < retry_at:
+        return False
+    connection = connections[alias]
+    # A persistent connection is already open; CONN_HEALTH_CHECKS revalidates it per request
+    if connection.connection is not None:
+        return True
+    try:
+        connection.ensure_connection()
+    except DatabaseError:
+        _unhealthy_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    _unhealthy_until.pop(alias, None)
+    return True
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Follow relations on the database the instance came from
+            return instance._state.db
+        replicas = [alias for alias in settings.REPLICA_DATABASES if replica_is_healthy(alias)]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary (see sync_replicas)
+        return db == DEFAULT_DB_ALIAS
+
+
+def _client_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return 'db-primary:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+class PrimaryStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_DATABASES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        key = _client_key(request)
+        return RoutingState(pinned=(
+            request.method not in SAFE_METHODS
+            or STICKY_COOKIE in request.COOKIES
+            or (key is not None and cache.get(key) is not None)
+        ))
+
+    def finish(self, request, response, state):
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax'
+            )
+            key = _client_key(request)
+            if key is not None:
+                cache.set(key, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
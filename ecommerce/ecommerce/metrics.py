@@ -0,0 +1,258 @@
+"""
+Per-route request and database metrics.
+
+MetricsMiddleware times every request, sync or async, and counts the SQL it
+issues through a connection execute wrapper, aggregating by resolved route
+name and HTTP method. Streaming responses, e.g. exports, query while their
+body is sent, so they are recorded once the stream ends. MetricsView
+exposes the aggregates in the Prometheus text format.
+
+Metrics live in process memory: with several workers, scrape each one.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RouteStats:
+    __slots__ = ('count', 'buckets', 'latency_sum', 'db_queries', 'db_time')
+
+    def __init__(self):
+        self.count = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, method, latency, db_queries, db_time):
+        bucket = bisect_left(LATENCY_BUCKETS, latency)
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                stats = self._routes[(route, method)] = RouteStats()
+            stats.count += 1
+            stats.buckets[bucket] += 1
+            stats.latency_sum += latency
+            stats.db_queries += db_queries
+            stats.db_time += db_time
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def snapshot(self):
+        """Return {(route, method): RouteStats copy} taken under the lock"""
+        with self._lock:
+            copies = {}
+            for key, stats in self._routes.items():
+                copy = RouteStats()
+                copy.count = stats.count
+                copy.buckets = list(stats.buckets)
+                copy.latency_sum = stats.latency_sum
+                copy.db_queries = stats.db_queries
+                copy.db_time = stats.db_time
+                copies[key] = copy
+            return copies
+
+    def render(self):
+        """Render all series in the Prometheus text exposition format"""
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            '# HELP ecommerce_http_requests_total Requests handled, by route and method.',
+            '# TYPE ecommerce_http_requests_total counter',
+        ]
+        for (route, method), stats in snapshot:
+            lines.append(f'ecommerce_http_requests_total{_labels(route, method)} {stats.count}')
+
+        lines += [
+            '# HELP ecommerce_http_request_duration_seconds Request latency, by route and method.',
+            '# TYPE ecommerce_http_request_duration_seconds histogram',
+        ]
+        for (route, method), stats in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else repr(bound)
+                lines.append(
+                    f'ecommerce_http_request_duration_seconds_bucket{_labels(route, method, le=le)} {cumulative}'
+                )
+            lines.append(f'ecommerce_http_request_duration_seconds_sum{_labels(route, method)} {stats.latency_sum:.6f}')
+            lines.append(f'ecommerce_http_request_duration_seconds_count{_labels(route, method)} {stats.count}')
+
+        lines += [
+            '# HELP ecommerce_db_queries_total SQL statements executed, by route and method.',
+            '# TYPE ecommerce_db_queries_total counter',
+        ]
+        for (route, method), stats in snapshot:
+            lines.append(f'ecommerce_db_queries_total{_labels(route, method)} {stats.db_queries}')
+
+        lines += [
+            '# HELP ecommerce_db_query_duration_seconds_total Time spent executing SQL, by route and method.',
+            '# TYPE ecommerce_db_query_duration_seconds_total counter',
+        ]
+        for (route, method), stats in snapshot:
+            lines.append(f'ecommerce_db_query_duration_seconds_total{_labels(route, method)} {stats.db_time:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(route, method, **extra):
+    pairs = [('route', route), ('method', method), *extra.items()]
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    __slots__ = ('queries', 'duration')
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+# The counter for the request being handled. Context variables follow the
+# request into sync_to_async threads, where async views run their queries.
+_current_counter = ContextVar('metrics_query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """Execute wrapper that charges statements to the current request's counter"""
+    counter = _current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.duration += perf_counter() - started
+        counter.queries += 1
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # Go first: execute_wrapper() context managers pop the last wrapper on exit
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+# Marks the end of a streamed body
+_END = object()
+
+
+def route_label(request):
+    """Low-cardinality route label: the URL name, else its pattern"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this module was imported missed the signal
+        for alias in connections:
+            install_query_counter(None, connections[alias])
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        return self.finish(request, response, started, counter)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_counter.reset(token)
+        return self.finish(request, response, started, counter)
+
+    def finish(self, request, response, started, counter):
+        if response.streaming:
+            wrap = self.measure_async_stream if response.is_async else self.measure_stream
+            response.streaming_content = wrap(response.streaming_content, request, started, counter)
+        else:
+            self.record(request, perf_counter() - started, counter)
+        return response
+
+    def measure_stream(self, chunks, request, started, counter):
+        """Yield `chunks`, charging their queries to the request, and record it when the stream ends"""
+        chunks = iter(chunks)
+        try:
+            while True:
+                token = _current_counter.set(counter)
+                try:
+                    chunk = next(chunks, _END)
+                finally:
+                    _current_counter.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            self.record(request, perf_counter() - started, counter)
+
+    async def measure_async_stream(self, chunks, request, started, counter):
+        chunks = aiter(chunks)
+        try:
+            while True:
+                token = _current_counter.set(counter)
+                try:
+                    chunk = await anext(chunks, _END)
+                finally:
+                    _current_counter.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            self.record(request, perf_counter() - started, counter)
+
+    def record(self, request, elapsed, counter):
+        registry.observe(route_label(request), request.method, elapsed, counter.queries, counter.duration)
+
+
+class MetricsView(APIView):
+    """Admin-only Prometheus scrape endpoint"""
+    authentication_classes = [*api_settings.DEFAULT_AUTHENTICATION_CLASSES, SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
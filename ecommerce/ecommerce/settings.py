@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +51,10 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.CustomUser'
 
 MIDDLEWARE = [
+    # First, so its timings and query counts cover the whole stack
+    'ecommerce.metrics.MetricsMiddleware',
+    # Before anything that queries, so sessions and auth see the request's routing
+    'ecommerce.db_router.PrimaryStickinessMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -63,10 +70,15 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'products.pagination.IdCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
 ROOT_URLCONF = 'ecommerce.urls'
@@ -96,9 +108,103 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Writers queue on the lock instead of failing with "database is locked";
+            # IMMEDIATE takes it at BEGIN so transactions never deadlock upgrading
+            # from a read lock to a write lock
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Keep connections open across requests, revalidating them before reuse
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas: a comma-separated list of database files, e.g.
+# DATABASE_REPLICAS=replica1.sqlite3,replica2.sqlite3. Locally these are copies
+# of db.sqlite3 refreshed by `manage.py sync_replicas`, opened read-only.
+REPLICA_DATABASES = []
+for index, replica_name in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{BASE_DIR / replica_name.strip()}?mode=ro',
+        'OPTIONS': {'timeout': 20},
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        # Tests run replicas against the test primary instead of separate databases
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['ecommerce.db_router.PrimaryReplicaRouter']
+
+# Reads stay on the primary for this many seconds after a client writes,
+# covering replication lag
+REPLICA_STICKY_SECONDS = 5
+
+# Seconds an unreachable replica is skipped before it is tried again
+REPLICA_RETRY_SECONDS = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory is per process; switch to FileBasedCache (or a shared cache
+# server) when running several workers so catalog invalidation is seen by all.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ecommerce',
+    },
+    # Rendered product JSON (see products/fragments.py); keys never go stale, so a
+    # per-process cache is fine, but it must hold a whole catalog
+    'product_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'product-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 50_000},
+    },
+}
+
+# Seconds a cached product list/detail payload may live for a given catalog version
+PRODUCT_CACHE_TIMEOUT = 300
+
+# Seconds a product's rendered JSON fragment is kept
+PRODUCT_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# Seconds a user's token version and full profile may be served from the cache;
+# on other workers' caches this bounds how long a revoked token keeps working
+USER_CACHE_TIMEOUT = 60
+
+# Seconds a cart holds reserved stock after its last change; run the
+# release_expired_reservations command periodically to hand it back
+CART_RESERVATION_TTL = 15 * 60
+
+# Idempotency-Key handling (see products/idempotency.py): seconds a stored
+# response is replayed, seconds a duplicate waits for the first request to
+# finish, and how many keys to keep; run the purge_idempotency_keys command
+# periodically to delete expired keys and enforce the cap
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_SECONDS = 10
+IDEMPOTENCY_MAX_RECORDS = 100_000
+
+# Background jobs (see products/jobs.py). Keep `manage.py run_jobs` running next
+# to the web server: seller analytics only include a checkout once its job has
+# run. Seconds a worker holds a claimed job before another may retry it, tries
+# before a job is marked failed, and the first and longest backoff delays
+JOB_LEASE_SECONDS = 5 * 60
+JOB_MAX_ATTEMPTS = 8
+JOB_RETRY_BASE_DELAY = 5
+JOB_RETRY_MAX_DELAY = 60 * 60
+
+# Default stock level below which the seller dashboard lists a product as low
+SELLER_LOW_STOCK_THRESHOLD = 5
+
+# Admin changelists count at most this many rows; unfiltered lists of larger
+# tables show the database's row estimate instead (see products/admin.py)
+ADMIN_EXACT_COUNT_LIMIT = 10_000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
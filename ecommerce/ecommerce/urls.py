@@ -16,9 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/metrics', MetricsView.as_view(), name='metrics'),
     path('api/users/', include('users.urls')),
     path('api/', include('products.urls')),
 ]
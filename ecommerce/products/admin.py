@@ -1,51 +1,182 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
 from .models import Products, Carts, CartItems, Checkouts, CheckoutItems
+from .search import search_products
+
+
+def estimated_count(queryset):
+    """Return the database's estimate of the rows in `queryset`'s table, or None if it has none"""
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            # The highest rowid is one index seek; deleted rows make it an overestimate
+            cursor.execute(f'SELECT MAX(rowid) FROM {table}')
+        else:
+            return None
+        row = cursor.fetchone()
+    # Postgres reports -1 for a table that was never analyzed
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that never counts a whole large table.
+
+    Unfiltered lists of tables past ADMIN_EXACT_COUNT_LIMIT rows use the
+    database's estimate; filtered lists are counted up to that many rows.
+    """
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        if not self.object_list.query.where:
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list[:limit].count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """
+    Changelist defaults for tables too large to count or list in full.
+
+    Subclasses join the relations their columns show with
+    list_select_related, edit foreign keys through autocomplete_fields, and
+    narrow dates with date_hierarchy instead of filters listing every value.
+    """
+    paginator = EstimatedCountPaginator
+    # Don't count the unfiltered table next to filtered results
+    show_full_result_count = False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Inline formset that edits one page of the related rows at a time"""
+    per_page = 20
+    # Set per request by PaginatedTabularInline.get_formset()
+    page_param = 'page'
+    page_number = None
+    query_params = QueryDict()
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self.paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = self.paginator.get_page(self.page_number)
+            self._queryset = self.page.object_list
+        return self._queryset
+
+    def page_url(self, number):
+        """The current URL's query string with only this formset's page changed"""
+        params = self.query_params.copy()
+        params[self.page_param] = number
+        return f'?{params.urlencode()}'
+
+    @property
+    def previous_page_url(self):
+        return self.page_url(self.page.previous_page_number())
+
+    @property
+    def next_page_url(self):
+        return self.page_url(self.page.next_page_number())
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    """
+    Tabular inline that shows `per_page` rows, paged with ?<formset prefix>-page=.
+
+    Autocomplete widgets still look their selected row up one by one, so a
+    change page costs queries in proportion to `per_page`, not to the rows.
+    """
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = 20
+    extra = 0
+    # Relations each row's widgets and title read
+    list_select_related = ()
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(*self.list_select_related)
 
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.per_page = self.per_page
+        formset.page_param = f'{formset.get_default_prefix()}-page'
+        formset.page_number = request.GET.get(formset.page_param)
+        # Other inlines' pages and the changelist filters stay in the paging links
+        formset.query_params = request.GET
+        return formset
 
-class ProductsAdmin(admin.ModelAdmin):
+
+class ProductsAdmin(ScalableAdmin):
     list_display = ('product_name', 'price', 'stock', 'created_at', 'seller')
+    list_select_related = ('seller',)
     search_fields = ('product_name', 'description')
-    list_filter = ('created_at',)
+    date_hierarchy = 'created_at'
     ordering = ('-created_at',)
+    autocomplete_fields = ('seller',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of LIKE scans, for the changelist and autocomplete
+        if not search_term:
+            return queryset, False
+        return search_products(queryset, search_term), False
 
 
-class CartItemsInline(admin.TabularInline):
+class CartItemsInline(PaginatedTabularInline):
     model = CartItems
-    extra = 1
+    list_select_related = ('product', 'cart__user')
+    autocomplete_fields = ('product',)
 
 
-class CartsAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'created_at')
+class CartsAdmin(ScalableAdmin):
+    list_display = ('id', 'user', 'status', 'created_at')
+    list_select_related = ('user',)
     search_fields = ('user__email', 'user__username')
-    list_filter = ('created_at',)
+    list_filter = ('status',)
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ('user',)
     inlines = [CartItemsInline]
 
 
-class CartItemsAdmin(admin.ModelAdmin):
+class CartItemsAdmin(ScalableAdmin):
     list_display = ('cart', 'product', 'quantity')
+    list_select_related = ('cart__user', 'product')
     search_fields = ('cart__user__email', 'product__product_name')
-    list_filter = ('cart',)
+    autocomplete_fields = ('cart', 'product')
 
 
-class CheckoutItemsInline(admin.TabularInline):
+class CheckoutItemsInline(PaginatedTabularInline):
     model = CheckoutItems
-    extra = 0
+    list_select_related = ('product', 'checkout__cart__user')
+    autocomplete_fields = ('product',)
 
 
-class CheckoutsAdmin(admin.ModelAdmin):
+class CheckoutsAdmin(ScalableAdmin):
     list_display = ('id', 'cart', 'total_amount', 'checkout_date')
+    list_select_related = ('cart__user',)
     search_fields = ('cart__user__email',)
-    list_filter = ('checkout_date',)
+    date_hierarchy = 'checkout_date'
+    autocomplete_fields = ('cart',)
     inlines = [CheckoutItemsInline]
 
 
-class CheckoutItemsAdmin(admin.ModelAdmin):
+class CheckoutItemsAdmin(ScalableAdmin):
     list_display = ('checkout_id', 'product', 'quantity')
+    # The checkout_id column is rendered from the related checkout
+    list_select_related = ('checkout__cart__user', 'product')
     search_fields = ('checkout_id__id', 'product__product_name')
+    autocomplete_fields = ('checkout', 'product')
 
 
 admin.site.register(Products, ProductsAdmin)
 admin.site.register(Carts, CartsAdmin)
 admin.site.register(CartItems, CartItemsAdmin)
 admin.site.register(Checkouts, CheckoutsAdmin)
-admin.site.register(CheckoutItems, CheckoutItemsAdmin)
\ No newline at end of file
+admin.site.register(CheckoutItems, CheckoutItemsAdmin)
@@ -0,0 +1,121 @@
+"""
+Async versions of the hottest read endpoints, for ASGI deployments.
+
+These are plain Django async views that mirror the responses of their
+DRF counterparts: product list/detail, active-cart retrieve and checkout
+history. Rows are fetched with the async ORM and serialized in memory with
+the same serializers, so no view holds a worker thread while it waits on
+the database. Under WSGI they still work, just without the benefit.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import acached_catalog_response
+from .fieldsets import Fieldset, sparse_queryset
+from .fragments import FRAGMENT_FIELDS, product_fragments, render_page
+from .models import Carts, OrderSummaries, Products
+from .pagination import CheckoutsCursorPagination
+from .serializers import CartSerializer, OrderSummarySerializer, ProductsSerializer
+from .views import ProductsViewSet, carts_for_read, summaries_for_read
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    # Bodies joined from product fragments arrive already rendered
+    content = data if isinstance(data, bytes) else JSONRenderer().render(data)
+    return HttpResponse(content, status=status_code, content_type='application/json')
+
+
+async def authenticate(request):
+    """
+    Run the configured DRF authenticators off the event loop.
+
+    Returns a DRF Request; raises APIException for invalid credentials, the
+    same way the sync views reject a bad token even on AllowAny endpoints.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    await sync_to_async(lambda: drf_request.user)()
+    return drf_request
+
+
+def api_view(view):
+    """Authenticate the request and turn DRF exceptions into JSON errors"""
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return render({'detail': f'Method "{request.method}" not allowed.'}, status.HTTP_405_METHOD_NOT_ALLOWED)
+        try:
+            drf_request = await authenticate(request)
+            return await view(drf_request, *args, **kwargs)
+        except APIException as exc:
+            return render({'detail': exc.detail} if isinstance(exc.detail, str) else exc.detail, exc.status_code)
+    return wrapper
+
+
+@api_view
+async def product_list(request):
+    async def build():
+        viewset = ProductsViewSet(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+        # Filter validation may look up the seller, so it stays synchronous
+        queryset = await sync_to_async(viewset.filter_queryset)(viewset.get_queryset())
+        paginator = viewset.paginator
+        if Fieldset.from_request(request) is None:
+            page = await paginator.apaginate_queryset(queryset.only(*FRAGMENT_FIELDS), request)
+            fragments = await sync_to_async(product_fragments)(page)
+            return render_page(paginator.get_paginated_response(None).data, fragments)
+        page = await paginator.apaginate_queryset(queryset, request)
+        serializer = ProductsSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data).data
+
+    return await acached_catalog_response(request._request, build, render)
+
+
+@api_view
+async def product_detail(request, pk):
+    async def build():
+        fieldset = Fieldset.from_request(request)
+        if fieldset is None:
+            products = Products.objects.only(*FRAGMENT_FIELDS)
+        else:
+            products = sparse_queryset(Products.objects.all(), ProductsSerializer, fieldset)
+        try:
+            product = await products.aget(pk=pk)
+        except Products.DoesNotExist:
+            raise NotFound('No Products matches the given query.')
+        except ValueError:
+            raise NotFound()
+        if fieldset is not None:
+            return ProductsSerializer(product, context={'request': request}).data
+        fragments = await sync_to_async(product_fragments)([product])
+        if not fragments:
+            raise NotFound('No Products matches the given query.')
+        return fragments[0]
+
+    return await acached_catalog_response(request._request, build, render)
+
+
+@api_view
+async def active_cart(request, user_id):
+    try:
+        carts = carts_for_read(request)
+        cart = await carts.filter(user_id=user_id, status='open').afirst()
+        if not cart:
+            cart = await carts.aget(pk=(await Carts.objects.aget_active(user_id)).pk)
+    except Exception as e:
+        return render({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+    return render(CartSerializer(cart, context={'request': request}).data)
+
+
+@api_view
+async def checkout_history(request, user_id):
+    paginator = CheckoutsCursorPagination()
+    summaries = summaries_for_read(request, OrderSummaries.objects.filter(user_id=user_id))
+    # DRF's cursor pagination has no async API; run its single query off the loop
+    page = await sync_to_async(paginator.paginate_queryset)(summaries, request)
+    return render(paginator.get_paginated_response(OrderSummarySerializer(page, many=True, context={'request': request}).data).data)
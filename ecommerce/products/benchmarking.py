@@ -0,0 +1,256 @@
+"""
+Helpers shared by the benchmark management commands.
+
+Benchmarks run against a throwaway test database seeded with a synthetic
+dataset, so they never touch db.sqlite3.
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from decimal import Decimal
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connections
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLPattern, URLResolver
+
+from .models import CartItems, Carts, CheckoutItems, Checkouts, OrderSummaries, Products
+from .rollups import rebuild_rollups
+
+User = get_user_model()
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+
+@contextmanager
+def benchmark_database(verbosity=0, file_backed=False):
+    """
+    Run the block against a freshly migrated test database, destroyed afterwards.
+
+    SQLite test databases live in memory unless `file_backed` is set, which
+    puts them in a temporary file so concurrent writers contend on real file
+    locks the way they do in production.
+    """
+    setup_test_environment()
+    old_names = []
+    tmpdir = tempfile.mkdtemp(prefix='benchmark-') if file_backed else None
+    try:
+        mirrors = []
+        for alias in connections:
+            connection = connections[alias]
+            if connection.settings_dict['TEST'].get('MIRROR'):
+                mirrors.append(connection)
+                continue
+            if tmpdir and connection.vendor == 'sqlite':
+                connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, f'{alias}.sqlite3')
+            old_names.append((connection.creation, connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)))
+        # Read replicas point at their primary's test database, as under the test runner
+        for connection in mirrors:
+            connection.creation.set_as_test_mirror(connections[connection.settings_dict['TEST']['MIRROR']].settings_dict)
+        cache.clear()
+        yield
+    finally:
+        for creation, old_name in old_names:
+            creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+@dataclass
+class Dataset:
+    customers: list = field(default_factory=list)
+    sellers: list = field(default_factory=list)
+    products: list = field(default_factory=list)
+    checkouts: list = field(default_factory=list)
+
+
+def seed_dataset(users=50, products=500, cart_items=10, checkouts=200, seed=0, stock=1_000_000):
+    """
+    Bulk-insert a synthetic dataset and return the ids in a Dataset.
+
+    One user in ten is a seller. Every customer gets an open cart holding
+    `cart_items` products, and `checkouts` historical orders are spread
+    across customers. Stock is large enough that benchmarks never run out.
+    """
+    rng = random.Random(seed)
+    password = make_password(BENCHMARK_PASSWORD)
+    seller_count = max(1, users // 10)
+
+    User.objects.bulk_create([
+        User(
+            username=f'bench{i}',
+            email=f'bench{i}@example.com',
+            password=password,
+            first_name='Bench',
+            last_name=str(i),
+            phone_number='+620000000000',
+            role='seller' if i < seller_count else 'customer',
+        )
+        for i in range(max(users, seller_count + 1))
+    ], batch_size=1000)
+    data = Dataset()
+    for user_id, role in User.objects.filter(username__startswith='bench').values_list('id', 'role'):
+        (data.sellers if role == 'seller' else data.customers).append(user_id)
+
+    Products.objects.bulk_create([
+        Products(
+            product_name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+            description=f'A {rng.choice(ADJECTIVES).lower()} {rng.choice(NOUNS).lower()} for everyday use.',
+            price=Decimal(rng.randint(100, 100_000)) / 100,
+            stock=stock,
+            seller_id=rng.choice(data.sellers),
+        )
+        for i in range(products)
+    ], batch_size=1000)
+    data.products = list(Products.objects.values_list('id', flat=True))
+
+    Carts.objects.bulk_create([Carts(user_id=user_id) for user_id in data.customers])
+    CartItems.objects.bulk_create([
+        CartItems(cart_id=cart_id, product_id=product_id, quantity=rng.randint(1, 3))
+        for cart_id in Carts.objects.filter(status='open').values_list('id', flat=True)
+        for product_id in rng.sample(data.products, min(cart_items, len(data.products)))
+    ], batch_size=1000)
+
+    seed_checkouts(data, checkouts, cart_items, rng)
+    return data
+
+
+def seed_checkouts(data, count, items_per_checkout, rng):
+    """Insert `count` historical checkouts, with their summaries, for random customers"""
+    if not count:
+        return
+    usernames = dict(User.objects.filter(id__in=data.customers).values_list('id', 'username'))
+    prices = dict(Products.objects.values_list('id', 'price'))
+    owners = [rng.choice(data.customers) for _ in range(count)]
+    carts = Carts.objects.bulk_create(
+        [Carts(user_id=user_id, status='checked_out') for user_id in owners], batch_size=1000
+    )
+
+    lines = [
+        [(product_id, rng.randint(1, 3)) for product_id in rng.sample(data.products, min(items_per_checkout, len(data.products)))]
+        for _ in carts
+    ]
+    checkouts = Checkouts.objects.bulk_create([
+        Checkouts(cart=cart, total_amount=sum(prices[p] * q for p, q in cart_lines))
+        for cart, cart_lines in zip(carts, lines)
+    ], batch_size=1000)
+    items = CheckoutItems.objects.bulk_create([
+        CheckoutItems(checkout=checkout, product_id=product_id, quantity=quantity)
+        for checkout, cart_lines in zip(checkouts, lines)
+        for product_id, quantity in cart_lines
+    ], batch_size=1000)
+
+    names = dict(Products.objects.values_list('id', 'product_name'))
+    items_by_checkout = {}
+    for item in items:
+        items_by_checkout.setdefault(item.checkout_id, []).append(item)
+    OrderSummaries.objects.bulk_create([
+        OrderSummaries(
+            checkout=checkout,
+            user_id=cart.user_id,
+            username=usernames[cart.user_id],
+            cart_id=cart.id,
+            checkout_date=checkout.checkout_date,
+            total_amount=checkout.total_amount,
+            item_count=len(items_by_checkout[checkout.id]),
+            lines=[
+                [item.id, item.product_id, names[item.product_id], str(prices[item.product_id]), item.quantity]
+                for item in items_by_checkout[checkout.id]
+            ],
+        )
+        for checkout, cart in zip(checkouts, carts)
+    ], batch_size=1000)
+    rebuild_rollups()
+    data.checkouts.extend(checkout.id for checkout in checkouts)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(name, latencies, queries, errors=0, **extra):
+    """Reduce raw per-request samples (seconds, query counts) to a report row"""
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    row = {
+        'name': name,
+        'requests': len(ordered),
+        'errors': errors,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(total / len(ordered) * 1000, 3) if ordered else 0.0,
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else 0.0,
+        'throughput_rps': round(len(ordered) / total, 1) if total else 0.0,
+    }
+    row.update(extra)
+    return row
+
+
+def timed_request(client, method, path, data=None, **extra):
+    """
+    Issue one request through the test client; returns (response, seconds, query count).
+
+    `data` is sent as JSON unless it is already-encoded bytes.
+    """
+    kwargs = dict(extra)
+    if isinstance(data, bytes):
+        # Already encoded, e.g. a multipart upload; the caller passes content_type
+        kwargs['data'] = data
+    elif data is not None:
+        kwargs['data'] = json.dumps(data)
+        kwargs['content_type'] = 'application/json'
+    with ExitStack() as stack:
+        # Every alias, so reads routed to a replica are counted too
+        captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        started = time.perf_counter()
+        response = client.generic(method, path, **kwargs)
+        if response.streaming:
+            # Exports run their queries while the body is consumed
+            for _ in response.streaming_content:
+                pass
+        elapsed = time.perf_counter() - started
+    return response, elapsed, sum(len(queries.captured_queries) for queries in captured)
+
+
+def registered_routes(*urlconfs):
+    """Return {(url name, HTTP method)} for every route in the given URLconf modules"""
+    routes = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                actions = getattr(pattern.callback, 'actions', None)
+                if actions:
+                    methods = [m for m in actions if m != 'head']
+                else:
+                    view_class = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+                    if view_class is None:
+                        # Plain function views, like the async read paths, only serve GET
+                        methods = ['get']
+                    else:
+                        methods = [m for m in ('get', 'post', 'put', 'patch', 'delete') if hasattr(view_class, m)]
+                routes.update((pattern.name, method.upper()) for method in methods)
+
+    for urlconf in urlconfs:
+        walk(import_module(urlconf).urlpatterns)
+    return routes
+
+
+ADJECTIVES = ['Classic', 'Compact', 'Deluxe', 'Eco', 'Portable', 'Premium', 'Smart', 'Wireless']
+NOUNS = ['Blender', 'Backpack', 'Headphones', 'Kettle', 'Lamp', 'Laptop', 'Speaker', 'Sneakers', 'Watch']
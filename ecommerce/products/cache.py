@@ -0,0 +1,131 @@
+"""
+Versioned cache for product catalog reads.
+
+Every product write bumps a single catalog version stored in Django's cache
+(see signals.py). Cached list and detail payloads are keyed by that version,
+so a bump invalidates all of them at once, and the version doubles as the
+ETag for conditional GETs.
+
+Use a shared backend (file, memcached, redis) when running several worker
+processes; the default local-memory cache is per process.
+
+Misses are read through the database router like any other read, so they
+reach the replicas. A client that just wrote is pinned to the primary (see
+db_router), so its own change is never cached stale; other clients may see
+a replica's lag until the next bump or PRODUCT_CACHE_TIMEOUT.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .fragments import PrerenderedJSONResponse, serves_fragments
+
+CATALOG_STATE_KEY = 'products:catalog_state'
+
+
+def _new_state():
+    now = time.time()
+    return {'version': time.time_ns(), 'modified': now}
+
+
+def get_catalog_state():
+    """Return the current {'version', 'modified'} catalog state, initialising it on a cold cache"""
+    state = cache.get(CATALOG_STATE_KEY)
+    if state is None:
+        state = _new_state()
+        if not cache.add(CATALOG_STATE_KEY, state, None):
+            state = cache.get(CATALOG_STATE_KEY, state)
+    return state
+
+
+async def aget_catalog_state():
+    state = await cache.aget(CATALOG_STATE_KEY)
+    if state is None:
+        state = _new_state()
+        if not await cache.aadd(CATALOG_STATE_KEY, state, None):
+            state = await cache.aget(CATALOG_STATE_KEY, state)
+    return state
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog payload and ETag"""
+    cache.set(CATALOG_STATE_KEY, _new_state(), None)
+
+
+def _validators(request, state):
+    """Return (etag, last_modified, cache key) for a request under a catalog state"""
+    path_digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    etag = f'"{state["version"]}-{path_digest[:16]}"'
+    return etag, int(state['modified']), f'products:v{state["version"]}:{path_digest}'
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _not_modified(request, etag):
+    """
+    A 304 response if the client's If-None-Match matches `etag`, else None.
+
+    If-Modified-Since alone never yields a 304: Last-Modified has one-second
+    resolution, so a bump in the same second as the client's last fetch
+    would go unnoticed.
+    """
+    return get_conditional_response(request, etag=etag)
+
+
+def cached_catalog_response(request, build_response):
+    """
+    Serve a catalog GET from the versioned cache.
+
+    Returns 304 when the client's If-None-Match still matches, without
+    touching the database. Otherwise returns the cached payload, or calls
+    `build_response()` and caches its data on success.
+    """
+    etag, last_modified, key = _validators(request, get_catalog_state())
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    data = cache.get(key)
+    if isinstance(data, bytes) and not serves_fragments(request):
+        # Bodies joined from fragments are JSON; e.g. the browsable API rebuilds its page
+        data = None
+    if data is None:
+        response = build_response()
+        if response.status_code != 200:
+            return response
+        # Responses joined from product fragments are cached as their bytes
+        payload = response.content if isinstance(response, PrerenderedJSONResponse) else response.data
+        cache.set(key, payload, settings.PRODUCT_CACHE_TIMEOUT)
+    elif isinstance(data, bytes):
+        response = PrerenderedJSONResponse(data)
+    else:
+        response = Response(data)
+    return _set_validators(response, etag, last_modified)
+
+
+async def acached_catalog_response(request, build_data, render):
+    """
+    Async variant of cached_catalog_response for plain Django views.
+
+    `build_data()` is awaited on a miss and returns the payload;
+    `render(data)` turns a payload into an HttpResponse.
+    """
+    etag, last_modified, key = _validators(request, await aget_catalog_state())
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    data = await cache.aget(key)
+    if data is None:
+        data = await build_data()
+        await cache.aset(key, data, settings.PRODUCT_CACHE_TIMEOUT)
+    return _set_validators(render(data), etag, last_modified)
@@ -0,0 +1,124 @@
+"""
+Streaming CSV and NDJSON exports.
+
+Rows come straight from values_list() tuples read with a server-side
+iterator, EXPORT_CHUNK_SIZE at a time, and are encoded one line at a time,
+so memory stays flat whatever the table size. The same generators feed
+the export endpoints (wrapped in a StreamingHttpResponse) and the
+export_data command (written to a file).
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import CheckoutItems, Checkouts, Products
+
+EXPORT_CHUNK_SIZE = 2000
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# name -> (default queryset, [(column, field lookup)])
+TABLES = {
+    'products': (
+        lambda: Products.objects.order_by('id'),
+        [
+            ('id', 'id'),
+            ('product_name', 'product_name'),
+            ('description', 'description'),
+            ('price', 'price'),
+            ('stock', 'stock'),
+            ('created_at', 'created_at'),
+            ('seller', 'seller_id'),
+            ('sku', 'sku'),
+        ],
+    ),
+    'checkouts': (
+        lambda: Checkouts.objects.order_by('id'),
+        [
+            ('id', 'id'),
+            ('cart', 'cart_id'),
+            ('user_id', 'cart__user_id'),
+            ('username', 'cart__user__username'),
+            ('total_amount', 'total_amount'),
+            ('checkout_date', 'checkout_date'),
+        ],
+    ),
+    'checkout-items': (
+        lambda: CheckoutItems.objects.order_by('id'),
+        [
+            ('id', 'id'),
+            ('checkout', 'checkout_id'),
+            ('product', 'product_id'),
+            ('product_name', 'product__product_name'),
+            ('product_price', 'product__price'),
+            ('quantity', 'quantity'),
+        ],
+    ),
+}
+
+
+class _Echo:
+    """File-like object whose write() returns the line, so csv.writer can encode one row at a time"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(table, queryset=None):
+    """Yield the header, then one tuple per row of `table` (optionally a filtered queryset)"""
+    default, columns = TABLES[table]
+    if queryset is None:
+        queryset = default()
+    yield tuple(column for column, _ in columns)
+    yield from queryset.values_list(*(lookup for _, lookup in columns)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _cell(value):
+    """Render dates and decimals the way the JSON API does"""
+    if isinstance(value, date):
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_csv(rows):
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def encode_ndjson(rows):
+    rows = iter(rows)
+    header = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(header, map(_cell, row)))) + '\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def export_lines(table, export_format, queryset=None):
+    """Yield the encoded lines of an export"""
+    return ENCODERS[export_format](export_rows(table, queryset))
+
+
+def streaming_export_response(table, export_format, queryset=None):
+    filename = f'{table}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+    response = StreamingHttpResponse(
+        export_lines(table, export_format, queryset),
+        content_type=FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
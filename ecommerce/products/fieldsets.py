@@ -0,0 +1,142 @@
+"""
+Sparse fieldsets for read endpoints.
+
+``?fields=`` keeps only the listed fields and ``?exclude=`` drops them.
+Both take comma-separated names, and nested item fields are written
+``items.<name>``: ``?fields=id,total_items`` is enough for a cart badge,
+``?fields=id,items.product,items.quantity`` lists the lines without product
+details, and ``?exclude=description`` slims the product list.
+
+SparseFieldsetMixin removes the unwanted fields from a serializer, and
+sparse_queryset() narrows the query to match: only() the columns the kept
+fields read, select_related() just the relations they follow, and prefetch
+nested items only when they are asked for. Unknown names are ignored.
+Writes always see the full serializer.
+"""
+from collections import defaultdict
+
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
+from rest_framework.serializers import ListSerializer
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _parse(value, leaves_only):
+    """Map each nested path ('' for the top level) to the names listed for it"""
+    selection = defaultdict(set)
+    for entry in value.split(','):
+        parts = entry.strip().split('.')
+        if not all(parts):
+            continue
+        # Keeping `items.id` means keeping `items`; excluding it doesn't exclude `items`
+        for depth in range(len(parts) - 1 if leaves_only else 0, len(parts)):
+            selection['.'.join(parts[:depth])].add(parts[depth])
+    return selection
+
+
+class Fieldset:
+    def __init__(self, fields=None, exclude=None):
+        self.include = _parse(fields, leaves_only=False) if fields else None
+        self.exclude = _parse(exclude, leaves_only=True) if exclude else {}
+
+    @classmethod
+    def from_request(cls, request):
+        """Return the request's Fieldset, or None for writes and requests that want every field"""
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields, exclude = params.get('fields'), params.get('exclude')
+        if not fields and not exclude:
+            return None
+        return cls(fields, exclude)
+
+    def keeps(self, path, name):
+        # Naming `items` without any `items.<name>` keeps every item field
+        if self.include is not None and path in self.include and name not in self.include[path]:
+            return False
+        return name not in self.exclude.get(path, ())
+
+
+def join_path(path, name):
+    return f'{path}.{name}' if path else name
+
+
+class SparseFieldsetMixin:
+    """Serializer mixin that drops the fields a read request didn't ask for"""
+
+    # Model lookups read by fields whose source doesn't say, e.g. SerializerMethodFields
+    field_lookups = {}
+
+    @cached_property
+    def fieldset(self):
+        return Fieldset.from_request(self.context.get('request'))
+
+    @cached_property
+    def fieldset_path(self):
+        """Dotted name of this serializer under the root one, e.g. 'items'"""
+        names = []
+        field = self
+        while field.parent is not None:
+            if field.field_name:
+                names.append(field.field_name)
+            field = field.parent
+        return '.'.join(reversed(names))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.fieldset is None:
+            return fields
+        return {name: field for name, field in fields.items() if self.fieldset.keeps(self.fieldset_path, name)}
+
+
+def _lookups(serializer_class, fieldset, path):
+    """Return (model lookups, {name: nested field}) for the fields `fieldset` keeps"""
+    meta = serializer_class.Meta.model._meta
+    lookups, nested = set(), {}
+    for name, field in serializer_class().fields.items():
+        if field.write_only or not fieldset.keeps(path, name):
+            continue
+        if isinstance(field, ListSerializer):
+            nested[name] = field
+        elif name in serializer_class.field_lookups:
+            lookups.update(serializer_class.field_lookups[name])
+        elif field.source != '*':
+            first, *rest = field.source.split('.')
+            # Sources may use the attname, e.g. `checkout_id`
+            lookups.add('__'.join([meta.get_field(first).name, *rest]))
+    return lookups, nested
+
+
+def sparse_queryset(queryset, serializer_class, fieldset, path='', extra=()):
+    """
+    Fetch only what the fields `fieldset` keeps of `serializer_class` read.
+
+    Replaces any select_related() and prefetch_related() on `queryset`.
+    `extra` lists further lookups to load, e.g. the pagination ordering.
+    """
+    lookups, nested = _lookups(serializer_class, fieldset, path)
+    lookups.update(extra)
+    relations = set()
+    for lookup in list(lookups):
+        parts = lookup.split('__')
+        for depth in range(1, len(parts)):
+            relations.add('__'.join(parts[:depth]))
+    lookups |= relations
+    # Deepest relations only; select_related() follows the ones above them
+    relations = {relation for relation in relations if not any(r.startswith(relation + '__') for r in relations)}
+
+    prefetches = []
+    for name, field in nested.items():
+        child = field.child
+        # The items are matched to their parent through this foreign key
+        parent_key = getattr(queryset.model, field.source).field.name
+        prefetches.append(Prefetch(field.source, queryset=sparse_queryset(
+            child.Meta.model.objects.all(), type(child), fieldset, join_path(path, name), extra=[parent_key]
+        )))
+
+    queryset = queryset.select_related(None).prefetch_related(None).prefetch_related(*prefetches)
+    # select_related() without arguments would follow every foreign key
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(queryset.model._meta.pk.name, *lookups)
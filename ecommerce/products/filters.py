@@ -0,0 +1,31 @@
+import django_filters
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Products
+from .search import search_products
+
+
+class ProductsFilter(django_filters.FilterSet):
+    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    min_stock = django_filters.NumberFilter(field_name='stock', lookup_expr='gte')
+    max_stock = django_filters.NumberFilter(field_name='stock', lookup_expr='lte')
+
+    class Meta:
+        model = Products
+        fields = ['seller']
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search on product name and description via `?search=`.
+
+    An explicit `?ordering=` still takes precedence over the search rank.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_products(queryset, text)
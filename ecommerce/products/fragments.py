@@ -0,0 +1,89 @@
+"""
+Pre-rendered JSON fragments of product representations.
+
+Running ProductsSerializer field by field and rendering the result costs
+far more than copying bytes, and most products don't change between
+reads. Each product's rendered JSON is kept in the ``product_fragments``
+cache under its id and updated_at. A write moves the product to a new key,
+and the old fragment simply expires, so nothing has to be deleted and
+workers don't need a shared cache. Every write path must therefore touch
+updated_at: save() does, and bulk updates set it explicitly.
+
+List and detail responses are assembled from the fragments. A warm page
+costs one query for ids and timestamps, one cache round trip and a join.
+Requests with sparse fieldsets, or for a renderer other than JSON, go
+through the serializer as before.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .fieldsets import Fieldset
+from .models import Products
+from .serializers import ProductsSerializer
+
+FRAGMENT_CACHE = 'product_fragments'
+
+# All a page query needs to look its fragments up
+FRAGMENT_FIELDS = ('id', 'updated_at')
+
+
+class PrerenderedJSONResponse(HttpResponse):
+    def __init__(self, content, **kwargs):
+        super().__init__(content, content_type='application/json', **kwargs)
+
+
+def serves_fragments(request):
+    """Whether a product read can be answered from fragments"""
+    return request.accepted_renderer.format == 'json' and Fieldset.from_request(request) is None
+
+
+def fragment_key(product_id, updated_at):
+    return f'products:fragment:{product_id}:{updated_at.timestamp():.6f}'
+
+
+def render_fragments(products):
+    """Serialize and render full product rows; returns {product id: (fragment key, JSON bytes)}"""
+    renderer = JSONRenderer()
+    return {
+        product.pk: (fragment_key(product.pk, product.updated_at), renderer.render(data))
+        for product, data in zip(products, ProductsSerializer(products, many=True).data)
+    }
+
+
+def product_fragments(products):
+    """
+    Return the rendered JSON of each product, in order.
+
+    `products` only need id and updated_at loaded. Misses are fetched in
+    one query, rendered and cached; products deleted in the meantime are
+    left out.
+    """
+    cache = caches[FRAGMENT_CACHE]
+    keys = {product.pk: fragment_key(product.pk, product.updated_at) for product in products}
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        # Rows changed since the page query are rendered as they are now
+        fresh = render_fragments(list(Products.objects.filter(pk__in=missing)))
+        cache.set_many(dict(fresh.values()), settings.PRODUCT_FRAGMENT_TIMEOUT)
+        fragments.update((pk, fragment) for pk, (_, fragment) in fresh.items())
+    return [fragments[product.pk] for product in products if product.pk in fragments]
+
+
+def render_page(envelope, fragments):
+    """Render a paginated response body whose `results` are pre-rendered fragments"""
+    renderer = JSONRenderer()
+    members = []
+    for name, value in envelope.items():
+        if name == 'results':
+            rendered = b'[' + b','.join(fragments) + b']'
+        else:
+            # render() turns None into an empty body
+            rendered = renderer.render(value) or b'null'
+        members.append(json.dumps(name).encode() + b':' + rendered)
+    return b'{' + b','.join(members) + b'}'
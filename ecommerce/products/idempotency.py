@@ -0,0 +1,155 @@
+"""
+Idempotency-Key support for mutating endpoints.
+
+Clients that retry after a timeout send the same ``Idempotency-Key`` header
+with the same request. The first request claims the key by inserting an
+IdempotencyRecords row, runs, and stores its response there, headers such
+as Location included. A retry gets that stored response back without
+touching carts, stock or orders. A duplicate that arrives while the first
+is still running polls the row until the response is stored, for up to
+IDEMPOTENCY_WAIT_SECONDS.
+
+Keys are scoped to the authenticated user (or shared by anonymous callers,
+whose keys are expected to be random UUIDs). Reusing a key for a different
+request is rejected. Server errors aren't stored, so the retry runs again.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from ecommerce.db_router import use_primary
+
+from .models import IdempotencyRecords
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Response headers stored with the body and sent again on replay
+STORED_HEADERS = ('Location', 'Content-Location', 'ETag', 'Last-Modified')
+
+# Seconds between checks while waiting for a concurrent duplicate
+POLL_INTERVAL = 0.05
+
+# An in-progress record this old belongs to a request that will never finish
+STALE_AFTER = timedelta(minutes=5)
+
+
+def request_scope(request):
+    user = request.user
+    return f'user:{user.pk}' if user and user.is_authenticated else 'anonymous'
+
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.get_full_path()} {payload}'.encode()).hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """Insert the in-progress record for `key`; returns None if another request holds it"""
+    now = timezone.now()
+    # Expired keys may be reused before the purge command deletes them, and a
+    # worker that died mid-request must not hold its key until then
+    IdempotencyRecords.objects.filter(scope=scope, key=key).filter(
+        Q(expires_at__lte=now) | Q(status_code__isnull=True, created_at__lte=now - STALE_AFTER)
+    ).delete()
+    try:
+        with transaction.atomic():
+            return IdempotencyRecords.objects.create(
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+    except IntegrityError:
+        return None
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.status_code, headers=record.response_headers)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Make a viewset method honour the Idempotency-Key header"""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        max_length = IdempotencyRecords._meta.get_field('key').max_length
+        if len(key) > max_length:
+            return Response(
+                {'error': f'{HEADER} must be at most {max_length} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        scope, fingerprint = request_scope(request), request_fingerprint(request)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        # The record may have just been written by another worker
+        with use_primary():
+            record = _claim(scope, key, fingerprint)
+            while record is None:
+                existing = IdempotencyRecords.objects.filter(scope=scope, key=key).first()
+                if existing is None:
+                    # The first request failed and released the key: run this one instead
+                    record = _claim(scope, key, fingerprint)
+                    continue
+                if existing.fingerprint != fingerprint:
+                    return Response(
+                        {'error': f'This {HEADER} was already used for a different request.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if existing.status_code is not None:
+                    return _replay(existing)
+                if time.monotonic() >= deadline:
+                    response = Response(
+                        {'error': f'A request with this {HEADER} is still being processed.'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                    response['Retry-After'] = '1'
+                    return response
+                time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+            return response
+        # Store exactly what the client will see, e.g. decimals rendered as the API renders them.
+        # The side effects are committed: if the record was purged or taken
+        # over meanwhile there is nothing to store, but the response stands
+        IdempotencyRecords.objects.filter(pk=record.pk).update(
+            status_code=response.status_code,
+            response_body=json.loads(JSONRenderer().render(response.data) or 'null'),
+            response_headers={name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+        )
+        return response
+
+    return wrapper
+
+
+def purge_records(now=None, max_records=None):
+    """Delete expired records, then the oldest beyond `max_records`; returns the number deleted"""
+    now = now or timezone.now()
+    max_records = settings.IDEMPOTENCY_MAX_RECORDS if max_records is None else max_records
+    deleted, _ = IdempotencyRecords.objects.filter(expires_at__lte=now).delete()
+    # The newest record past the cap; it and everything older go
+    cutoff = IdempotencyRecords.objects.order_by('-id').values_list('id', flat=True)[max_records:max_records + 1]
+    if cutoff:
+        extra, _ = IdempotencyRecords.objects.filter(id__lte=cutoff[0]).delete()
+        deleted += extra
+    return deleted
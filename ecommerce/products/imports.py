@@ -0,0 +1,147 @@
+"""
+Bulk product import.
+
+Uploads are read a row at a time: CSV with a header row, or NDJSON with
+one object per line. Each row is validated by ProductImportRowSerializer,
+so the price and stock rules match the products API. Valid rows are
+upserted on (seller, sku), IMPORT_CHUNK_SIZE per transaction, with one
+INSERT ... ON CONFLICT DO UPDATE per chunk. Invalid rows are skipped and
+reported by row number; the rest of the file is still imported.
+"""
+import csv
+import io
+import json
+import os
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .cache import bump_catalog_version
+from .models import Products
+from .serializers import ProductImportRowSerializer
+
+IMPORT_CHUNK_SIZE = 1000
+
+# Later errors are counted but not listed, so a broken file can't produce a huge report
+MAX_REPORTED_ERRORS = 1000
+
+# updated_at is set by auto_now and retires the product's cached JSON (see fragments.py)
+UPDATE_FIELDS = ['product_name', 'description', 'price', 'stock', 'updated_at']
+
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row, errors, sku=None):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'sku': sku, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            # Stock checks against held units run per chunk, after the row checks
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def detect_format(filename, requested=None):
+    """Return 'csv' or 'ndjson' from an explicit choice or the file extension, else None"""
+    if requested:
+        return requested if requested in EXTENSIONS.values() else None
+    return EXTENSIONS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def read_rows(binary_file, import_format):
+    """Yield (row number, dict or None, parse error or None); CSV numbering counts the header"""
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    if import_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            # Cells past the header land under the None key
+            row.pop(None, None)
+            yield number, row, None
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Expected a JSON object'
+            continue
+        yield number, row, None
+
+
+def import_products(binary_file, seller_id, import_format, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and upsert every row of the file for `seller_id`; returns an ImportReport"""
+    report = ImportReport()
+    row_serializer = ProductImportRowSerializer()
+    first_seen = {}
+    chunk = []
+    try:
+        for number, row, error in read_rows(binary_file, import_format):
+            if error:
+                report.add_error(number, {'non_field_errors': [error]})
+                continue
+            try:
+                data = row_serializer.run_validation(row)
+            except ValidationError as e:
+                report.add_error(number, e.detail, row.get('sku'))
+                continue
+            first = first_seen.setdefault(data['sku'], number)
+            if first != number:
+                report.add_error(number, {'sku': [f'Duplicate of row {first}']}, data['sku'])
+                continue
+            chunk.append((number, data))
+            if len(chunk) >= chunk_size:
+                _upsert(seller_id, chunk, report)
+                chunk = []
+        if chunk:
+            _upsert(seller_id, chunk, report)
+    finally:
+        if report.created or report.updated:
+            bump_catalog_version()
+    return report
+
+
+def _upsert(seller_id, rows, report):
+    with transaction.atomic():
+        # Stock may not drop below what open carts hold (see reservations.py)
+        held = dict(
+            Products.objects.filter(seller_id=seller_id, sku__in=[data['sku'] for _, data in rows])
+            .values_list('sku', 'reserved')
+        )
+        products = []
+        for number, data in rows:
+            reserved = held.get(data['sku'], 0)
+            if data['stock'] < reserved:
+                report.add_error(
+                    number, {'stock': [f'Stock cannot be lower than the {reserved} units held in carts']}, data['sku']
+                )
+                continue
+            products.append(Products(seller_id=seller_id, **data))
+        Products.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['seller', 'sku'],
+            update_fields=UPDATE_FIELDS,
+        )
+    updated = sum(1 for product in products if product.sku in held)
+    report.updated += updated
+    report.created += len(products) - updated
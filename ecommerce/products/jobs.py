@@ -0,0 +1,128 @@
+"""
+Database-backed background jobs.
+
+Work that doesn't have to finish before a response, e.g. adding a
+checkout's sales to the seller rollups, is queued as a Jobs row with
+enqueue(). Enqueue inside the transaction that makes the work necessary:
+the job commits with it, or not at all. The run_jobs command claims due
+jobs and runs them in a thread or process pool; no broker is needed.
+
+Delivery is at least once. A claimed job is leased until `run_after`; a
+worker that dies mid-job leaves the lease to expire and the job is claimed
+again. A job that raises is retried with exponential backoff, and marked
+failed, with its last error kept, after JOB_MAX_ATTEMPTS tries. Handlers
+must therefore be idempotent. Finished jobs are deleted.
+
+Handlers live in each app's ``tasks`` module and register with @handler:
+
+    @handler('checkouts.completed')
+    def checkout_completed(checkout_id):
+        ...
+
+They get the job's payload as keyword arguments.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from ecommerce.db_router import use_primary
+
+from .models import Jobs
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(name):
+    """Register the decorated function as the handler for jobs called `name`"""
+    def register(func):
+        HANDLERS[name] = func
+        return func
+    return register
+
+
+def load_handlers():
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, payload=None, delay=0):
+    """Queue a `name` job with a JSON-serializable `payload`, due in `delay` seconds"""
+    return Jobs.objects.create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(limit, now=None):
+    """Lease up to `limit` due jobs, oldest first, to the caller; returns them"""
+    now = now or timezone.now()
+    with use_primary(), transaction.atomic():
+        # SQLite's IMMEDIATE transactions already keep two workers from claiming
+        # the same job; skip_locked does it on databases with row locks
+        due = list(
+            Jobs.objects.select_for_update(skip_locked=True)
+            .filter(status__in=['queued', 'running'], run_after__lte=now)
+            .order_by('run_after', 'id')[:limit]
+        )
+        lease_until = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        for job in due:
+            job.status = 'running'
+            job.attempts += 1
+            job.run_after = lease_until
+        Jobs.objects.bulk_update(due, ['status', 'attempts', 'run_after'])
+    return due
+
+
+def retry_delay(attempts):
+    """Seconds before retrying a job that failed its `attempts`th try, with up to 10% jitter"""
+    delay = min(settings.JOB_RETRY_MAX_DELAY, settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return delay * random.uniform(1, 1.1)
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome; returns 'done', 'retry' or 'failed'.
+
+    The outcome is only written while the job is still this run's: if the
+    lease ran out and another worker claimed it, that worker records it.
+    """
+    if job.name not in HANDLERS:
+        # A fresh worker process hasn't imported the handlers yet
+        load_handlers()
+    close_old_connections()
+    try:
+        with use_primary():
+            try:
+                HANDLERS[job.name](**job.payload)
+            except Exception:
+                error = traceback.format_exc()
+                logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.name, job.attempts)
+            else:
+                Jobs.objects.filter(pk=job.pk, attempts=job.attempts).delete()
+                return 'done'
+
+            mine = Jobs.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+            if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+                mine.update(status='failed', last_error=error)
+                return 'failed'
+            mine.update(
+                status='queued',
+                last_error=error,
+                run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+            return 'retry'
+    finally:
+        close_old_connections()
+
+
+def retry_failed():
+    """Queue failed jobs for another round of tries; returns how many"""
+    return Jobs.objects.filter(status='failed').update(status='queued', attempts=0, run_after=timezone.now())
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from products.query_plans import full_scans, hot_queries
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN every hot-path query and fail if any reads a whole table. '
+        'Run it after migrate in CI to catch plan regressions before deploy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset, page in hot_queries(using=options['database']):
+            plan, tables = full_scans(queryset, page)
+            if tables:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FULL SCAN  {label}: {", ".join(tables)}'))
+            else:
+                self.stdout.write(f'ok         {label}')
+            if tables or options['verbosity'] > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f'             {line}')
+        if failures:
+            raise CommandError(f'{len(failures)} hot-path queries fall back to a full scan: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Every hot-path query uses an index'))
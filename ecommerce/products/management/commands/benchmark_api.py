@@ -0,0 +1,286 @@
+import io
+import json
+import random
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import resolve
+from django.utils import timezone
+
+from products.benchmarking import (
+    BENCHMARK_PASSWORD,
+    benchmark_database,
+    registered_routes,
+    seed_dataset,
+    summarize,
+    timed_request,
+)
+from products.models import CartItems, Carts, CheckoutItems, Checkouts, Products
+from users.models import CustomUser
+from users.serializers import CustomTokenObtainPairSerializer
+
+
+class Context:
+    """Seeded ids plus helpers that create fresh rows for destructive endpoints"""
+
+    def __init__(self, data, cart_items, rng):
+        self.data = data
+        self.cart_items = cart_items
+        self.rng = rng
+        self.counter = 0
+
+    def next(self):
+        self.counter += 1
+        return self.counter
+
+    def customer(self):
+        return self.rng.choice(self.data.customers)
+
+    def seller(self):
+        return self.rng.choice(self.data.sellers)
+
+    def product(self):
+        return self.rng.choice(self.data.products)
+
+    def checkout(self):
+        return self.rng.choice(self.data.checkouts)
+
+    def open_cart(self):
+        return Carts.objects.get_active(self.customer())
+
+    def cart_item(self):
+        cart = self.open_cart()
+        item, _ = CartItems.objects.get_or_create(cart=cart, product_id=self.product(), defaults={'quantity': 1})
+        return item
+
+    def filled_cart(self):
+        cart = self.open_cart()
+        cart.apply_operations([
+            {'op': 'set', 'product': product_id, 'quantity': 1}
+            for product_id in self.rng.sample(self.data.products, self.cart_items)
+        ])
+        return cart
+
+    def new_customer(self):
+        n = self.next()
+        return CustomUser.objects.create(
+            username=f'fresh{n}', email=f'fresh{n}@example.com', role='customer',
+            first_name='Fresh', last_name=str(n), phone_number='+620000000000',
+        )
+
+    def new_product(self):
+        return Products.objects.create(
+            product_name=f'Disposable {self.next()}', description='Created for a benchmark',
+            price=Decimal('9.99'), stock=10, seller_id=self.seller(),
+        )
+
+    def new_checkout(self):
+        cart = Carts.objects.create(user_id=self.customer(), status='checked_out')
+        checkout = Checkouts.objects.create(cart=cart, total_amount=Decimal('9.99'))
+        CheckoutItems.objects.create(checkout=checkout, product_id=self.product(), quantity=1)
+        return checkout
+
+    def auth(self, user_id):
+        user = CustomUser.objects.get(id=user_id)
+        return {'HTTP_AUTHORIZATION': f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'}
+
+    def staff_auth(self):
+        staff, _ = CustomUser.objects.get_or_create(
+            username='benchstaff', defaults={'email': 'benchstaff@example.com', 'role': 'customer', 'is_staff': True},
+        )
+        return self.auth(staff.id)
+
+    def import_upload(self, rows=100):
+        """A seller's multipart upload of a `rows`-line CSV; skus repeat, so later uploads mostly update"""
+        lines = ['sku,product_name,description,price,stock'] + [
+            f'bench-{(self.next() * rows + i) % (rows * 5)},Imported {i},Created by benchmark_api,19.99,100'
+            for i in range(rows)
+        ]
+        upload = io.BytesIO('\n'.join(lines).encode())
+        upload.name = 'products.csv'
+        body = encode_multipart(BOUNDARY, {'file': upload})
+        return body, {'content_type': MULTIPART_CONTENT, **self.auth(self.seller())}
+
+    def product_payload(self):
+        return {
+            'product_name': f'Benchmark product {self.next()}',
+            'description': 'Created by benchmark_api',
+            'price': '19.99',
+            'stock': 100,
+            'seller': self.seller(),
+        }
+
+
+# (label, route name, method, prepare) where prepare(ctx) -> (path, payload)
+# or (path, payload, extra request headers) runs untimed before every request
+ENDPOINTS = [
+    ('api root', 'api-root', 'GET', lambda c: ('/api/', None)),
+
+    ('products list', 'products-list', 'GET', lambda c: ('/api/products/', None)),
+    ('products search', 'products-list', 'GET', lambda c: ('/api/products/?search=smart+lamp', None)),
+    ('products filter', 'products-list', 'GET', lambda c: (f'/api/products/?seller={c.seller()}&min_price=10&ordering=-price', None)),
+    ('products create', 'products-list', 'POST', lambda c: ('/api/products/', c.product_payload())),
+    ('products retrieve', 'products-detail', 'GET', lambda c: (f'/api/products/{c.product()}/', None)),
+    ('products update', 'products-detail', 'PUT', lambda c: (f'/api/products/{c.product()}/', c.product_payload())),
+    ('products partial update', 'products-detail', 'PATCH', lambda c: (f'/api/products/{c.product()}/', {'stock': 1_000_000})),
+    ('products export', 'products-export', 'GET', lambda c: ('/api/products/export/', None, c.staff_auth())),
+    ('products import', 'products-import', 'POST', lambda c: ('/api/products/import/', *c.import_upload())),
+    ('products destroy', 'products-detail', 'DELETE', lambda c: (f'/api/products/{c.new_product().id}/', None)),
+
+    ('carts list', 'carts-list', 'GET', lambda c: ('/api/carts/', None)),
+    ('carts create', 'carts-list', 'POST', lambda c: ('/api/carts/', {'user': c.new_customer().id})),
+    ('carts retrieve active', 'carts-detail', 'GET', lambda c: (f'/api/carts/{c.customer()}/', None)),
+    ('carts update', 'carts-detail', 'PUT', lambda c: (lambda cart: (f'/api/carts/{cart.id}/', {'user': cart.user_id}))(c.open_cart())),
+    ('carts partial update', 'carts-detail', 'PATCH', lambda c: (lambda cart: (f'/api/carts/{cart.id}/', {'user': cart.user_id}))(c.open_cart())),
+    ('carts destroy', 'carts-detail', 'DELETE', lambda c: (f'/api/carts/{Carts.objects.get_active(c.new_customer().id).id}/', None)),
+    ('carts add item', 'carts-add-item', 'POST', lambda c: (f'/api/carts/{c.open_cart().id}/add_item/', {'product': c.product(), 'quantity': 1})),
+    ('carts batch', 'carts-batch', 'POST', lambda c: (f'/api/carts/{c.open_cart().id}/batch/', {'operations': [
+        {'op': 'add', 'product': c.product(), 'quantity': 1} for _ in range(c.cart_items)
+    ]})),
+    ('carts sync', 'carts-sync', 'POST', lambda c: (lambda cart: (f'/api/carts/{cart.id}/sync/', {
+        'version': cart.version,
+        'items': [{'product': product_id, 'quantity': 2} for product_id in c.rng.sample(c.data.products, c.cart_items)],
+    }))(c.open_cart())),
+    ('carts clear', 'carts-clear', 'DELETE', lambda c: (f'/api/carts/{c.filled_cart().id}/clear/', None)),
+
+    ('cart items list', 'cart-items-list', 'GET', lambda c: ('/api/cart-items/', None)),
+    ('cart items create', 'cart-items-list', 'POST', lambda c: ('/api/cart-items/', {'user_id': c.customer(), 'product': c.product(), 'quantity': 1})),
+    ('cart items retrieve', 'cart-items-detail', 'GET', lambda c: (f'/api/cart-items/{c.cart_item().id}/', None)),
+    ('cart items update', 'cart-items-detail', 'PUT', lambda c: (lambda item: (f'/api/cart-items/{item.id}/', {'product': item.product_id, 'quantity': 2}))(c.cart_item())),
+    ('cart items partial update', 'cart-items-detail', 'PATCH', lambda c: (f'/api/cart-items/{c.cart_item().id}/', {'quantity': 2})),
+    ('cart items destroy', 'cart-items-detail', 'DELETE', lambda c: (f'/api/cart-items/{c.cart_item().id}/', None)),
+
+    ('checkouts list', 'checkouts-list', 'GET', lambda c: ('/api/checkouts/', None)),
+    ('checkouts create', 'checkouts-list', 'POST', lambda c: ('/api/checkouts/', {'cart': c.filled_cart().id})),
+    ('checkouts history', 'checkouts-history', 'GET', lambda c: (f'/api/checkouts/user/{c.customer()}/', None)),
+    ('checkouts history authenticated', 'checkouts-history', 'GET', lambda c: (lambda user_id: (f'/api/checkouts/user/{user_id}/', None, c.auth(user_id)))(c.customer())),
+    ('checkouts retrieve', 'checkouts-detail', 'GET', lambda c: (f'/api/checkouts/{c.checkout()}/', None)),
+    ('checkouts export', 'checkouts-export', 'GET', lambda c: ('/api/checkouts/export/?type=ndjson', None, c.staff_auth())),
+    ('checkouts update', 'checkouts-detail', 'PUT', lambda c: (lambda checkout: (f'/api/checkouts/{checkout.id}/', {'cart': checkout.cart_id, 'total_amount': '9.99'}))(c.new_checkout())),
+    ('checkouts partial update', 'checkouts-detail', 'PATCH', lambda c: (f'/api/checkouts/{c.checkout()}/', {'total_amount': '10.00'})),
+    ('checkouts destroy', 'checkouts-detail', 'DELETE', lambda c: (f'/api/checkouts/{c.new_checkout().id}/', None)),
+
+    ('checkout items list', 'checkout-items-list', 'GET', lambda c: ('/api/checkout-items/', None)),
+    ('checkout items create', 'checkout-items-list', 'POST', lambda c: ('/api/checkout-items/', {'checkout': c.checkout(), 'product': c.product(), 'quantity': 1})),
+    ('checkout items retrieve', 'checkout-items-detail', 'GET', lambda c: (f'/api/checkout-items/{CheckoutItems.objects.filter(checkout_id=c.checkout()).values_list("id", flat=True).first()}/', None)),
+    ('checkout items export', 'checkout-items-export', 'GET', lambda c: ('/api/checkout-items/export/', None, c.staff_auth())),
+    ('checkout items update', 'checkout-items-detail', 'PUT', lambda c: (lambda item: (f'/api/checkout-items/{item.id}/', {'checkout': item.checkout_id, 'product': item.product_id, 'quantity': 2}))(c.new_checkout().checkoutitems_set.get())),
+    ('checkout items partial update', 'checkout-items-detail', 'PATCH', lambda c: (f'/api/checkout-items/{c.new_checkout().checkoutitems_set.get().id}/', {'quantity': 3})),
+    ('checkout items destroy', 'checkout-items-detail', 'DELETE', lambda c: (f'/api/checkout-items/{c.new_checkout().checkoutitems_set.get().id}/', None)),
+
+    ('sellers analytics', 'sellers-analytics', 'GET', lambda c: (lambda seller: (f'/api/sellers/{seller}/analytics/?interval=week', None, c.auth(seller)))(c.seller())),
+    ('sellers dashboard', 'sellers-dashboard', 'GET', lambda c: (lambda seller: (f'/api/sellers/{seller}/dashboard/?low_stock=20', None, c.auth(seller)))(c.seller())),
+
+    ('async products list', 'async-products-list', 'GET', lambda c: ('/api/async/products/', None)),
+    ('async products filter', 'async-products-list', 'GET', lambda c: (f'/api/async/products/?seller={c.seller()}&min_price=10&ordering=-price', None)),
+    ('async products retrieve', 'async-products-detail', 'GET', lambda c: (f'/api/async/products/{c.product()}/', None)),
+    ('async carts retrieve active', 'async-carts-detail', 'GET', lambda c: (f'/api/async/carts/{c.customer()}/', None)),
+    ('async checkouts history', 'async-checkouts-history', 'GET', lambda c: (f'/api/async/checkouts/user/{c.customer()}/', None)),
+
+    ('users register', 'register', 'POST', lambda c: (lambda n: ('/api/users/register/', {
+        'username': f'reg{n}', 'email': f'reg{n}@example.com', 'password': 'S3cure-pass!', 'password_confirmation': 'S3cure-pass!',
+        'first_name': 'Reg', 'last_name': str(n), 'phone_number': '+6281234567890', 'role': 'customer',
+    }))(c.next())),
+    ('users login', 'token_obtain_pair', 'POST', lambda c: ('/api/users/login/', {
+        'email': CustomUser.objects.values_list('email', flat=True).get(id=c.customer()), 'password': BENCHMARK_PASSWORD,
+    })),
+    ('users token refresh', 'token_refresh', 'POST', lambda c: ('/api/users/token/refresh/', {
+        'refresh': str(CustomTokenObtainPairSerializer.get_token(CustomUser.objects.get(id=c.customer()))),
+    })),
+    ('users logout all', 'logout_all', 'POST', lambda c: ('/api/users/logout-all/', None, c.auth(c.customer()))),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic dataset into a throwaway database, drive every API route through '
+        'the test client and report latency percentiles, queries per request and throughput as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users to create; one in ten is a seller')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--cart-items', type=int, default=10, help='Items per cart and per historical checkout')
+        parser.add_argument('--checkouts', type=int, default=200, help='Historical checkouts to seed')
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Clear the Django cache before every request to measure the database path',
+        )
+        parser.add_argument('--only', default='', help='Comma-separated substrings; run only matching endpoints')
+        parser.add_argument('--label', default='', help='Free-form label stored in the report, e.g. a commit hash')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        only = [term.strip() for term in options['only'].split(',') if term.strip()]
+        endpoints = [e for e in ENDPOINTS if not only or any(term in e[0] for term in only)]
+        log = self.stderr if not options['output'] else self.stdout
+
+        with benchmark_database():
+            data = seed_dataset(
+                users=options['users'],
+                products=options['products'],
+                cart_items=options['cart_items'],
+                checkouts=options['checkouts'],
+                seed=options['seed'],
+            )
+            ctx = Context(data, options['cart_items'], random.Random(options['seed']))
+            client = Client()
+            results = []
+            for label, route, method, prepare in endpoints:
+                results.append(self.run_endpoint(client, ctx, label, route, method, prepare, options))
+                row = results[-1]
+                log.write(
+                    f"{label:<32} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                    f"p99 {row['p99_ms']:>8.2f}ms  {row['queries_per_request']:>6.1f} q/req  "
+                    f"{row['throughput_rps']:>8.1f} req/s  errors {row['errors']}"
+                )
+
+        covered = {(row['route'], row['method']) for row in results}
+        uncovered = sorted(registered_routes('products.urls', 'users.urls') - covered) if not only else []
+        report = {
+            'label': options['label'],
+            'created_at': timezone.now().isoformat(),
+            'dataset': {
+                key: options[key] for key in ('users', 'products', 'cart_items', 'checkouts', 'seed')
+            },
+            'cold_cache': options['cold_cache'],
+            'iterations': options['iterations'],
+            'endpoints': results,
+            'uncovered_routes': [f'{method} {name}' for name, method in uncovered],
+        }
+        if uncovered:
+            log.write(self.style.WARNING(f'Routes without a benchmark: {report["uncovered_routes"]}'))
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+
+    def run_endpoint(self, client, ctx, label, route, method, prepare, options):
+        latencies, queries, errors, statuses = [], [], 0, {}
+        for i in range(options['warmup'] + options['iterations']):
+            path, payload, *headers = prepare(ctx)
+            if options['cold_cache']:
+                cache.clear()
+            response, elapsed, query_count = timed_request(client, method, path, payload, **(headers[0] if headers else {}))
+            if i < options['warmup']:
+                continue
+            latencies.append(elapsed)
+            queries.append(query_count)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 400:
+                errors += 1
+
+        resolved = resolve(path.split('?')[0]).url_name
+        if resolved != route:
+            self.stderr.write(self.style.WARNING(f'{label}: expected route {route}, got {resolved}'))
+        return summarize(label, latencies, queries, errors, route=route, method=method, statuses=statuses)
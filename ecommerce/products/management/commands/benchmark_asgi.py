@@ -0,0 +1,151 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from ecommerce.metrics import registry
+from products.benchmarking import benchmark_database, seed_dataset, summarize
+
+# (label, prepare) where prepare(data, rng) -> path below /api/; the sync
+# route is /api/<path> and the async one /api/async/<path>
+READ_PATHS = [
+    ('products list', lambda d, rng: 'products/'),
+    ('products filter', lambda d, rng: f'products/?seller={rng.choice(d.sellers)}&min_price=10&ordering=-price'),
+    ('products retrieve', lambda d, rng: f'products/{rng.choice(d.products)}/'),
+    ('carts retrieve active', lambda d, rng: f'carts/{rng.choice(d.customers)}/'),
+    ('checkouts history', lambda d, rng: f'checkouts/user/{rng.choice(d.customers)}/'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare concurrent throughput of the hot read paths: sync views under WSGI '
+        '(a thread per connection), the same views under ASGI, and the async views under ASGI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users to create; one in ten is a seller')
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--cart-items', type=int, default=10, help='Items per cart and per historical checkout')
+        parser.add_argument('--checkouts', type=int, default=200, help='Historical checkouts to seed')
+        parser.add_argument('--requests', type=int, default=300, help='Timed requests per path and mode')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--cold-cache', action='store_true',
+            help='Clear the Django cache before every request to measure the database path',
+        )
+        parser.add_argument('--only', default='', help='Comma-separated substrings; run only matching paths')
+        parser.add_argument('--label', default='', help='Free-form label stored in the report, e.g. a commit hash')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        only = [term.strip() for term in options['only'].split(',') if term.strip()]
+        paths = [p for p in READ_PATHS if not only or any(term in p[0] for term in only)]
+        log = self.stderr if not options['output'] else self.stdout
+
+        with benchmark_database():
+            data = seed_dataset(
+                users=options['users'],
+                products=options['products'],
+                cart_items=options['cart_items'],
+                checkouts=options['checkouts'],
+                seed=options['seed'],
+            )
+            results = []
+            for label, prepare in paths:
+                rng = random.Random(options['seed'])
+                requests = [prepare(data, rng) for _ in range(options['requests'])]
+                for mode, run in (
+                    ('wsgi sync', lambda: self.run_wsgi([f'/api/{p}' for p in requests], options)),
+                    ('asgi sync', lambda: self.run_asgi([f'/api/{p}' for p in requests], options)),
+                    ('asgi async', lambda: self.run_asgi([f'/api/async/{p}' for p in requests], options)),
+                ):
+                    results.append(self.measure(f'{label} [{mode}]', run, mode))
+                    row = results[-1]
+                    log.write(
+                        f"{row['name']:<36} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                        f"{row['queries_per_request']:>6.1f} q/req  {row['concurrent_rps']:>8.1f} req/s  "
+                        f"errors {row['errors']}"
+                    )
+
+        report = {
+            'label': options['label'],
+            'created_at': timezone.now().isoformat(),
+            'dataset': {
+                key: options[key] for key in ('users', 'products', 'cart_items', 'checkouts', 'seed')
+            },
+            'cold_cache': options['cold_cache'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'paths': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+
+    def measure(self, name, run, mode):
+        cache.clear()
+        registry.reset()
+        started = time.perf_counter()
+        samples = run()
+        wall = time.perf_counter() - started
+        # The metrics middleware counted queries per request in every thread
+        routes = registry.snapshot().values()
+        queries = [sum(s.db_queries for s in routes) / max(1, sum(s.count for s in routes))]
+        latencies = [elapsed for elapsed, _ in samples]
+        errors = sum(1 for _, status in samples if status >= 400)
+        return summarize(
+            name, latencies, queries, errors,
+            mode=mode, concurrent_rps=round(len(samples) / wall, 1) if wall else 0.0,
+        )
+
+    def run_wsgi(self, paths, options):
+        """A pool of worker threads, each with its own client and connection, like a threaded WSGI server"""
+        def worker(chunk):
+            client = Client()
+            samples = []
+            try:
+                for path in chunk:
+                    if options['cold_cache']:
+                        cache.clear()
+                    started = time.perf_counter()
+                    response = client.get(path)
+                    samples.append((time.perf_counter() - started, response.status_code))
+            finally:
+                connections.close_all()
+            return samples
+
+        workers = options['concurrency']
+        chunks = [paths[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [sample for samples in pool.map(worker, chunks) for sample in samples]
+
+    def run_asgi(self, paths, options):
+        """Up to `concurrency` requests in flight on one event loop"""
+        async def main():
+            client = AsyncClient()
+            limit = asyncio.Semaphore(options['concurrency'])
+
+            async def one(path):
+                async with limit:
+                    if options['cold_cache']:
+                        cache.clear()
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(*(one(path) for path in paths))
+
+        return asyncio.run(main())
@@ -0,0 +1,145 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.db.models import Sum
+from django.test import Client
+from django.utils import timezone
+
+from products.benchmarking import benchmark_database, seed_dataset, summarize
+from products.models import CheckoutItems, Carts, Products, StockReservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Flash-sale contention benchmark: threads add a few hot products to their carts and '
+        'check out concurrently against a file-backed database, then the stock ledger is '
+        'audited for overselling.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent customers')
+        parser.add_argument('--operations', type=int, default=100, help='Requests per thread')
+        parser.add_argument('--products', type=int, default=5, help='Hot products everyone competes for')
+        parser.add_argument('--stock', type=int, default=100, help='Initial stock of each product')
+        parser.add_argument('--checkout-every', type=int, default=3, help='Check out after this many adds')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help='Free-form label stored in the report, e.g. a commit hash')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        log = self.stderr if not options['output'] else self.stdout
+        # Sold-out 400s are expected here; don't log each one
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+
+        with benchmark_database(file_backed=True):
+            data = seed_dataset(
+                users=options['threads'] + 1,
+                products=options['products'],
+                cart_items=0,
+                checkouts=0,
+                seed=options['seed'],
+                stock=options['stock'],
+            )
+            connections.close_all()
+
+            samples = defaultdict(list)
+            outcomes = defaultdict(lambda: defaultdict(int))
+            lock = threading.Lock()
+            start = threading.Barrier(options['threads'])
+
+            def customer(index, user_id):
+                rng = random.Random(options['seed'] + index)
+                client = Client()
+                try:
+                    start.wait()
+                    for n in range(1, options['operations'] + 1):
+                        if n % (options['checkout_every'] + 1):
+                            kind = 'add to cart'
+                            method, path = client.post, '/api/cart-items/'
+                            payload = {'user_id': user_id, 'product': rng.choice(data.products), 'quantity': rng.randint(1, 3)}
+                        else:
+                            kind = 'checkout'
+                            method, path = client.post, '/api/checkouts/'
+                            payload = {'cart': Carts.objects.get_active(user_id).id}
+                        started = time.perf_counter()
+                        try:
+                            outcome = method(path, json.dumps(payload), content_type='application/json').status_code
+                        except OperationalError as e:
+                            outcome = f'OperationalError: {e}'
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            samples[kind].append(elapsed)
+                            outcomes[kind][outcome] += 1
+                finally:
+                    connections.close_all()
+
+            threads = [
+                threading.Thread(target=customer, args=(i, user_id))
+                for i, user_id in enumerate(data.customers[:options['threads']])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+
+            results = []
+            for kind, latencies in samples.items():
+                statuses = {str(key): value for key, value in outcomes[kind].items()}
+                errors = sum(value for key, value in outcomes[kind].items() if not isinstance(key, int) or key >= 500)
+                results.append(summarize(kind, latencies, [], errors, statuses=statuses))
+                row = results[-1]
+                log.write(
+                    f"{kind:<14} p50 {row['p50_ms']:>8.2f}ms  p95 {row['p95_ms']:>8.2f}ms  "
+                    f"p99 {row['p99_ms']:>8.2f}ms  statuses {statuses}"
+                )
+            audit = self.audit(options['stock'])
+
+        total = sum(len(latencies) for latencies in samples.values())
+        report = {
+            'label': options['label'],
+            'created_at': timezone.now().isoformat(),
+            'settings': {
+                key: options[key] for key in ('threads', 'operations', 'products', 'stock', 'checkout_every', 'seed')
+            },
+            'wall_seconds': round(wall, 3),
+            'throughput_rps': round(total / wall, 1) if wall else 0.0,
+            'operations': results,
+            'audit': audit,
+        }
+        log.write(f"{total} requests in {wall:.2f}s ({report['throughput_rps']} req/s); audit {audit}")
+        if audit['violations']:
+            log.write(self.style.ERROR('Stock ledger is inconsistent'))
+
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(payload)
+
+    def audit(self, initial_stock):
+        """Check sold + stock == initial, reserved == ledger total and reserved <= stock for every product"""
+        sold = dict(CheckoutItems.objects.values('product').annotate(total=Sum('quantity')).values_list('product', 'total'))
+        held = dict(StockReservations.objects.values('product').annotate(total=Sum('quantity')).values_list('product', 'total'))
+        violations = []
+        for product_id, stock, reserved in Products.objects.values_list('id', 'stock', 'reserved'):
+            if stock + sold.get(product_id, 0) != initial_stock:
+                violations.append({'product': product_id, 'problem': 'stock does not add up', 'stock': stock, 'sold': sold.get(product_id, 0)})
+            if reserved != held.get(product_id, 0):
+                violations.append({'product': product_id, 'problem': 'reserved differs from ledger', 'reserved': reserved, 'ledger': held.get(product_id, 0)})
+            if reserved > stock:
+                violations.append({'product': product_id, 'problem': 'reserved exceeds stock', 'reserved': reserved, 'stock': stock})
+        return {
+            'units_sold': sum(sold.values()),
+            'units_reserved': sum(held.values()),
+            'violations': violations,
+        }
@@ -0,0 +1,105 @@
+import json
+import random
+import time
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from products.benchmarking import benchmark_database, seed_dataset, summarize
+from products.fragments import FRAGMENT_CACHE, FRAGMENT_FIELDS, product_fragments, render_page
+from products.models import Products
+from products.serializers import ProductsSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Product rendering benchmark: builds product list pages and details from a seeded '
+        'catalog through ProductsSerializer and from cached JSON fragments, and reports the '
+        'process CPU time each takes per request. Rows are fetched outside the timed part, '
+        'except the queries fragments make for cache misses.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000, help='Catalog size')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=200, help='Pages and details rendered per variant')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help='Free-form label stored in the report, e.g. a commit hash')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        log = self.stderr if not options['output'] else self.stdout
+        fragments_cache = caches[FRAGMENT_CACHE]
+        page_size = options['page_size']
+
+        with benchmark_database():
+            seed_dataset(users=20, products=options['products'], cart_items=0, checkouts=0, seed=options['seed'])
+            catalog = Products.objects.order_by('-created_at', '-id')
+            rng = random.Random(options['seed'])
+            last_page = max(1, options['products'] // page_size)
+            offsets = [rng.randrange(last_page) * page_size for _ in range(options['requests'])]
+            pages = {
+                'list': [(offset, page_size) for offset in offsets],
+                'detail': [(offset, 1) for offset in offsets],
+            }
+            envelope = {'count': options['products'], 'next': None, 'previous': None, 'results': None}
+
+            def serializer(rows):
+                data = ProductsSerializer(rows, many=True).data
+                return JSONRenderer().render({**envelope, 'results': data} if len(rows) > 1 else data[0])
+
+            def fragments(rows):
+                rendered = product_fragments(rows)
+                return render_page(envelope, rendered) if len(rows) > 1 else rendered[0]
+
+            def warm_up():
+                product_fragments(list(catalog.only(*FRAGMENT_FIELDS)))
+
+            # (name, queryset, build, run before the timed loop, run before each request)
+            variants = [
+                ('serializer', catalog, serializer, None, None),
+                ('fragments (cold)', catalog.only(*FRAGMENT_FIELDS), fragments, None, fragments_cache.clear),
+                ('fragments (warm)', catalog.only(*FRAGMENT_FIELDS), fragments, warm_up, None),
+            ]
+            results = []
+            for kind, slices in pages.items():
+                for name, queryset, build, setup, before in variants:
+                    if setup:
+                        setup()
+                    samples, queries = [], []
+                    for offset, limit in slices:
+                        rows = list(queryset[offset:offset + limit])
+                        if before:
+                            before()
+                        with CaptureQueriesContext(connection) as captured:
+                            started = time.process_time()
+                            build(rows)
+                            samples.append(time.process_time() - started)
+                        queries.append(len(captured.captured_queries))
+                    results.append(summarize(f'{kind}: {name}', samples, queries, measure='cpu'))
+                    row = results[-1]
+                    log.write(
+                        f"{row['name']:<26} CPU p50 {row['p50_ms']:>8.3f}ms  p95 {row['p95_ms']:>8.3f}ms  "
+                        f"mean {row['mean_ms']:>8.3f}ms  queries {row['queries_per_request']}"
+                    )
+                baseline, warm = results[-3]['mean_ms'], results[-1]['mean_ms']
+                if warm:
+                    log.write(f'{kind}: warm fragments take {baseline / warm:.1f}x less CPU than the serializer')
+
+        report = {
+            'label': options['label'],
+            'created_at': timezone.now().isoformat(),
+            'settings': {key: options[key] for key in ('products', 'page_size', 'requests', 'seed')},
+            'operations': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(payload)
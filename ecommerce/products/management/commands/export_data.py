@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from products.exports import FORMATS, TABLES, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream a full table dump as CSV or NDJSON without loading it into memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(TABLES))
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        lines = export_lines(options['table'], options['export_format'])
+        if not options['output']:
+            sys.stdout.writelines(lines)
+            return
+        count = 0
+        with open(options['output'], 'w', newline='', encoding='utf-8') as fh:
+            for line in lines:
+                fh.write(line)
+                count += 1
+        rows = count - 1 if options['export_format'] == 'csv' else count
+        self.stderr.write(self.style.SUCCESS(f'Wrote {max(rows, 0)} rows to {options["output"]}'))
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from products.imports import IMPORT_CHUNK_SIZE, detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = "Create or update a seller's products from a CSV or NDJSON file, matched on sku."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--seller', type=int, required=True, help='ID of the seller who owns the products')
+        parser.add_argument('--format', dest='import_format', choices=['csv', 'ndjson'], help='Default: from the extension')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows upserted per transaction')
+
+    def handle(self, *args, **options):
+        if not get_user_model().objects.filter(pk=options['seller'], role='seller').exists():
+            raise CommandError(f'Seller with ID {options["seller"]} does not exist.')
+        import_format = detect_format(options['path'], options['import_format'])
+        if import_format is None:
+            raise CommandError('Unsupported file type. Use .csv or .ndjson, or pass --format.')
+
+        with open(options['path'], 'rb') as fh:
+            report = import_products(fh, options['seller'], import_format, chunk_size=options['chunk_size'])
+
+        for error in report.errors:
+            messages = '; '.join(f"{field}: {' '.join(map(str, problems))}" for field, problems in error['errors'].items())
+            self.stderr.write(f"row {error['row']} ({error['sku'] or 'no sku'}): {messages}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... and {report.error_count - len(report.errors)} more errors')
+        style = self.style.WARNING if report.error_count else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{report.created} created, {report.updated} updated, {report.error_count} rows rejected'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products.idempotency import purge_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete expired Idempotency-Key records and, past IDEMPOTENCY_MAX_RECORDS, the oldest ones. '
+        'Run it every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-records', type=int, help='Override IDEMPOTENCY_MAX_RECORDS')
+
+    def handle(self, *args, **options):
+        deleted = purge_records(max_records=options['max_records'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idempotency records'))
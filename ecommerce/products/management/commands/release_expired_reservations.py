@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from products.reservations import reconcile_reserved, release_expired
+
+
+class Command(BaseCommand):
+    help = 'Release stock held by cart reservations that have expired. Run it every minute or so.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reservations released per transaction')
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help='Also recompute Products.reserved from the ledger, e.g. after carts were deleted in bulk',
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired reservations'))
+        if options['reconcile']:
+            fixed = reconcile_reserved()
+            self.stdout.write(self.style.SUCCESS(f'Reconciled reserved stock on {fixed} products'))
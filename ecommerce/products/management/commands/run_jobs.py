@@ -0,0 +1,92 @@
+import logging
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from multiprocessing import get_context
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+
+from products.jobs import claim, load_handlers, retry_failed, run_job
+
+logger = logging.getLogger('products.jobs')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run queued background jobs, e.g. the seller rollups of checkouts, in a pool of threads '
+        'or processes. Keep one or more running; jobs left by a stopped worker are picked up '
+        'again once its lease expires.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Jobs run concurrently')
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'], default='thread',
+            help='Run jobs in threads, or in processes for CPU-bound handlers',
+        )
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between checks of an empty queue')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due instead of waiting for more')
+        parser.add_argument('--retry-failed', action='store_true', help='Queue failed jobs for another round of tries first')
+
+    def handle(self, *args, **options):
+        load_handlers()
+        if options['retry_failed']:
+            self.stdout.write(f'Queued {retry_failed()} failed jobs again')
+
+        workers = max(1, options['workers'])
+        if options['pool'] == 'process':
+            # Spawned processes don't inherit this one's database connections
+            executor = ProcessPoolExecutor(workers, mp_context=get_context('spawn'), initializer=django.setup)
+        else:
+            executor = ThreadPoolExecutor(workers, thread_name_prefix='job')
+
+        stopping = []
+
+        def stop(signum, frame):
+            self.stdout.write('Finishing running jobs before exiting')
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        outcomes = {'done': 0, 'retry': 0, 'failed': 0}
+
+        def record(future):
+            try:
+                outcomes[future.result()] += 1
+            except Exception:
+                # The outcome wasn't stored, e.g. the database was locked; the
+                # job is claimed again once its lease runs out
+                logger.exception('Recording a job outcome failed')
+                outcomes['retry'] += 1
+
+        running = set()
+        try:
+            while not stopping:
+                try:
+                    claimed = claim(workers - len(running)) if len(running) < workers else []
+                except DatabaseError:
+                    logger.exception('Claiming jobs failed')
+                    claimed = []
+                for job in claimed:
+                    running.add(executor.submit(run_job, job))
+                if not running:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future)
+        finally:
+            executor.shutdown(wait=True)
+            for future in running:
+                record(future)
+            connections.close_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {sum(outcomes.values())} jobs: {outcomes['done']} done, "
+            f"{outcomes['retry']} to retry, {outcomes['failed']} failed"
+        ))
@@ -0,0 +1,54 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def sqlite_path(name):
+    """Filesystem path of a NAME that may be a `file:...?mode=ro` URI"""
+    name = str(name)
+    if name.startswith('file:'):
+        name = name[len('file:'):].split('?', 1)[0]
+    return name
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database into every replica file using the online backup API. '
+        'A local stand-in for replication when DATABASE_REPLICAS is set.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep syncing every this many seconds, simulating replication lag; 0 syncs once',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured; set DATABASE_REPLICAS')
+        if connections[DEFAULT_DB_ALIAS].vendor != 'sqlite':
+            raise CommandError('sync_replicas only copies SQLite databases; use real replication elsewhere')
+
+        while True:
+            self.sync()
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self):
+        source = sqlite3.connect(sqlite_path(connections[DEFAULT_DB_ALIAS].settings_dict['NAME']))
+        try:
+            for alias in settings.REPLICA_DATABASES:
+                path = sqlite_path(connections[alias].settings_dict['NAME'])
+                started = time.perf_counter()
+                target = sqlite3.connect(path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: copied to {path} in {time.perf_counter() - started:.3f}s')
+        finally:
+            source.close()
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+FTS_TABLE = 'products_products_fts'
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        product_name,
+        description,
+        content='products_products',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Rank name matches ten times higher than description matches
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f"""
+    CREATE TRIGGER products_products_fts_ai AFTER INSERT ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, product_name, description)
+        VALUES (new.id, new.product_name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER products_products_fts_ad AFTER DELETE ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, description)
+        VALUES ('delete', old.id, old.product_name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER products_products_fts_au AFTER UPDATE OF product_name, description ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, description)
+        VALUES ('delete', old.id, old.product_name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, product_name, description)
+        VALUES (new.id, new.product_name, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS products_products_fts_ai',
+    'DROP TRIGGER IF EXISTS products_products_fts_ad',
+    'DROP TRIGGER IF EXISTS products_products_fts_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_products_seller'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_status(apps, schema_editor):
+    Carts = apps.get_model('products', 'Carts')
+    Carts.objects.filter(checkouts__isnull=False).update(status='checked_out')
+
+    # Older code could leave several unpaid carts per user; keep the newest open
+    newest_open = Carts.objects.filter(
+        user_id=OuterRef('user_id'), status='open'
+    ).order_by('-created_at', '-id').values('id')[:1]
+    Carts.objects.filter(status='open').exclude(
+        id=Subquery(newest_open)
+    ).update(status='abandoned')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_products_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carts',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('checked_out', 'Checked out'), ('abandoned', 'Abandoned')], default='open', max_length=20),
+        ),
+        migrations.RunPython(backfill_status, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='carts',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'open')), fields=('user',), name='unique_open_cart_per_user'),
+        ),
+    ]
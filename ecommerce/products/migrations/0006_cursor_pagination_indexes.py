@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_carts_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carts',
+            index=models.Index(fields=['-created_at', '-id'], name='carts_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='checkouts',
+            index=models.Index(fields=['-checkout_date', '-id'], name='checkouts_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    Checkouts = apps.get_model('products', 'Checkouts')
+    CheckoutItems = apps.get_model('products', 'CheckoutItems')
+    OrderSummaries = apps.get_model('products', 'OrderSummaries')
+
+    checkouts = Checkouts.objects.select_related('cart__user').order_by('id')
+    lines_by_checkout = {}
+    for item in CheckoutItems.objects.select_related('product').order_by('id').iterator():
+        lines_by_checkout.setdefault(item.checkout_id, []).append([
+            item.id, item.product_id, item.product.product_name, str(item.product.price), item.quantity,
+        ])
+
+    OrderSummaries.objects.bulk_create([
+        OrderSummaries(
+            checkout_id=checkout.id,
+            user_id=checkout.cart.user_id,
+            username=checkout.cart.user.username,
+            cart_id=checkout.cart_id,
+            checkout_date=checkout.checkout_date,
+            total_amount=checkout.total_amount,
+            item_count=len(lines_by_checkout.get(checkout.id, [])),
+            lines=lines_by_checkout.get(checkout.id, []),
+        )
+        for checkout in checkouts.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_cursor_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSummaries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150)),
+                ('cart_id', models.BigIntegerField()),
+                ('checkout_date', models.DateTimeField()),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_count', models.PositiveIntegerField()),
+                ('lines', models.JSONField(default=list)),
+                ('checkout', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='products.checkouts')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='order_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-checkout_date', '-id'], name='order_summary_user_date_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
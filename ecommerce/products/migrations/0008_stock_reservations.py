@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from products.search import reinstall_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_ordersummaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        # Adding the column rebuilt products_products without its FTS triggers
+        migrations.RunPython(reinstall_fts_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='StockReservations',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.carts')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.products')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='reservation_expires_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cart', 'product'), name='unique_reservation_per_cart_product')],
+            },
+        ),
+    ]
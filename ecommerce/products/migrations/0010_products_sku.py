@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+from products.search import reinstall_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_seller_sales_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='products',
+            constraint=models.UniqueConstraint(fields=('seller', 'sku'), name='unique_seller_sku'),
+        ),
+        # Both operations rebuilt products_products without its FTS triggers
+        migrations.RunPython(reinstall_fts_triggers, migrations.RunPython.noop),
+    ]
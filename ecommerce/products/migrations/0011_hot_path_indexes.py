@@ -0,0 +1,68 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+from products.search import reinstall_fts_triggers
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Fold repeated (cart, product) lines into the oldest one, summing quantities"""
+    CartItems = apps.get_model('products', 'CartItems')
+    duplicates = (
+        CartItems.objects.values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates.iterator():
+        lines = CartItems.objects.filter(cart_id=row['cart_id'], product_id=row['product_id'])
+        lines.filter(id=row['keep']).update(quantity=row['total'])
+        lines.exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_products_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Reservations are per (cart, product) totals already, so merging lines leaves them valid
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cartitems',
+            name='cart',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='products.carts'),
+        ),
+        migrations.AlterField(
+            model_name='carts',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='products',
+            name='seller',
+            field=models.ForeignKey(db_index=False, default=None, limit_choices_to={'role': 'seller'}, on_delete=django.db.models.deletion.CASCADE, related_name='products', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='carts',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='carts_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['-created_at', '-id'], name='products_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='products_seller_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitems',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_item_per_product'),
+        ),
+        # Altering products.seller rebuilt products_products without its FTS triggers
+        migrations.RunPython(reinstall_fts_triggers, migrations.RunPython.noop),
+    ]
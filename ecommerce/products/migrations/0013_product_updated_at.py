@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:23
+
+from django.db import migrations, models
+
+from products.search import reinstall_fts_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='products',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        # AddField rebuilt products_products without its FTS triggers
+        migrations.RunPython(reinstall_fts_triggers, migrations.RunPython.noop),
+    ]
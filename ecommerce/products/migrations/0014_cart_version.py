@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carts',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
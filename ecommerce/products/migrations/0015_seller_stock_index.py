@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_cart_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='products',
+            index=models.Index(fields=['seller', 'stock', 'id'], name='products_seller_stock_idx'),
+        ),
+    ]
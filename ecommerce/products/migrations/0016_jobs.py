@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_seller_stock_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Jobs',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_after', models.DateTimeField()),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='jobs_status_run_after_idx')],
+            },
+        ),
+        # Existing orders were added to the rollups when they were placed
+        migrations.AddField(
+            model_name='ordersummaries',
+            name='sales_recorded',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='ordersummaries',
+            name='sales_recorded',
+            field=models.BooleanField(default=False),
+        ),
+    ]
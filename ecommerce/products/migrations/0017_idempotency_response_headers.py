@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencyrecords',
+            name='response_headers',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
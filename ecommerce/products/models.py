@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Count, DecimalField, F, Prefetch, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
 class Products(models.Model):
@@ -6,38 +8,207 @@ class Products(models.Model):
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField()
+    # Units held by open carts (see StockReservations); available = stock - reserved
+    reserved = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Keys the cached JSON fragment (see fragments.py); bulk updates must set it too
+    updated_at = models.DateTimeField(auto_now=True)
     seller = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE,
         limit_choices_to={'role': 'seller'},
         related_name='products',
-        default=None
+        default=None,
+        # Covered by the (seller, ...) indexes below
+        db_index=False,
     )
+    # The seller's own product code; bulk imports upsert on (seller, sku)
+    sku = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Catalog pages, newest first, with and without ?seller=
+            models.Index(fields=['-created_at', '-id'], name='products_created_id_idx'),
+            models.Index(fields=['seller', '-created_at', '-id'], name='products_seller_created_idx'),
+            # A seller's low-stock products, lowest first
+            models.Index(fields=['seller', 'stock', 'id'], name='products_seller_stock_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], name='unique_seller_sku'),
+        ]
 
     def __str__(self):
         return self.product_name
     
+class CartsQuerySet(models.QuerySet):
+    def with_items(self):
+        """Fetch owner, items and their products up front with totals computed in SQL"""
+        return self.select_related('user').prefetch_related(
+            Prefetch('cartitems_set', queryset=CartItems.objects.select_related('product'))
+        ).with_items_count().with_items_total()
+
+    def with_items_count(self):
+        return self.annotate(items_count=Count('cartitems'))
+
+    def with_items_total(self):
+        return self.annotate(items_total=Coalesce(
+            Sum(F('cartitems__quantity') * F('cartitems__product__price')),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+
+    def get_active(self, user_id):
+        """Return the user's open cart, creating it on first use"""
+        cart, created = self.get_or_create(user_id=user_id, status='open')
+        return cart
+
+    async def aget_active(self, user_id):
+        cart, created = await self.aget_or_create(user_id=user_id, status='open')
+        return cart
+
+
 class Carts(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    STATUS_CHOICES = (
+        ('open', 'Open'),
+        ('checked_out', 'Checked out'),
+        ('abandoned', 'Abandoned'),
+    )
+    # Indexed by carts_user_created_idx
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    # Bumped by every change to the items; clients sync against it (see CartsViewSet.sync)
+    version = models.PositiveIntegerField(default=0)
+
+    objects = CartsQuerySet.as_manager()
+
+    def bump_version(self):
+        Carts.objects.filter(pk=self.pk).update(version=F('version') + 1)
+
+    def apply_operations(self, operations):
+        """
+        Apply add / set / remove operations with bulk writes.
+
+        Each operation is a dict with `op`, `product` (an id) and, except for
+        remove, `quantity`; a resulting quantity of zero removes the item.
+        Returns the number of created, updated and deleted items.
+        """
+        product_ids = {operation['product'] for operation in operations}
+        existing = {
+            item.product_id: item
+            for item in self.cartitems_set.filter(product_id__in=product_ids)
+        }
+
+        quantities = {product_id: item.quantity for product_id, item in existing.items()}
+        for operation in operations:
+            product_id = operation['product']
+            if operation['op'] == 'add':
+                quantities[product_id] = quantities.get(product_id, 0) + operation['quantity']
+            elif operation['op'] == 'set':
+                quantities[product_id] = operation['quantity']
+            else:
+                quantities[product_id] = 0
+
+        to_create, to_update, to_delete = [], [], []
+        for product_id, quantity in quantities.items():
+            item = existing.get(product_id)
+            if item is None:
+                if quantity > 0:
+                    to_create.append(CartItems(cart=self, product_id=product_id, quantity=quantity))
+            elif quantity <= 0:
+                to_delete.append(item.pk)
+            elif quantity != item.quantity:
+                item.quantity = quantity
+                to_update.append(item)
+
+        if to_create:
+            CartItems.objects.bulk_create(to_create)
+        if to_update:
+            CartItems.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            CartItems.objects.filter(pk__in=to_delete).delete()
+        return {'created': len(to_create), 'updated': len(to_update), 'deleted': len(to_delete)}
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='carts_created_id_idx'),
+            # A user's carts, newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='carts_user_created_idx'),
+        ]
+        constraints = [
+            # At most one open cart per user; also serves the active-cart lookup
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=Q(status='open'),
+                name='unique_open_cart_per_user',
+            ),
+        ]
 
     def __str__(self):
         return f"Cart of {self.user.username}"
     
 class CartItems(models.Model):
-    cart = models.ForeignKey(Carts, on_delete=models.CASCADE)
+    # Indexed by unique_cart_item_per_product
+    cart = models.ForeignKey(Carts, on_delete=models.CASCADE, db_index=False)
     product = models.ForeignKey(Products, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
 
+    class Meta:
+        constraints = [
+            # One line per product; adding an existing product raises its quantity
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_item_per_product'),
+        ]
+
     def __str__(self):
         return f"{self.quantity} of {self.product.product_name} in {self.cart}"
     
+class StockReservations(models.Model):
+    """
+    Stock held for a cart line until `expires_at`.
+
+    Products.reserved is the running total of these rows per product; see
+    products/reservations.py for the code that keeps the two in step.
+    """
+    cart = models.ForeignKey(Carts, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_reservation_per_cart_product'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} of product {self.product_id} held for cart {self.cart_id}"
+
+
+class CheckoutsQuerySet(models.QuerySet):
+    def with_items(self):
+        """Fetch owner, items and their products up front with the item count computed in SQL"""
+        return self.select_related('cart__user').prefetch_related(
+            Prefetch('checkoutitems_set', queryset=CheckoutItems.objects.select_related('product'))
+        ).with_items_count()
+
+    def with_items_count(self):
+        return self.annotate(items_count=Count('checkoutitems'))
+
+
 class Checkouts(models.Model):
     cart = models.OneToOneField(Carts, on_delete=models.CASCADE)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     checkout_date = models.DateTimeField(auto_now_add=True)
 
+    objects = CheckoutsQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-checkout_date', '-id'], name='checkouts_date_id_idx'),
+        ]
+
     def __str__(self):
         return f"Checkout for {self.cart}"
     
@@ -47,4 +218,177 @@ class CheckoutItems(models.Model):
     quantity = models.PositiveIntegerField()
 
     def __str__(self):
-        return f"{self.quantity} of {self.product.product_name} in {self.checkout}"
\ No newline at end of file
+        return f"{self.quantity} of {self.product.product_name} in {self.checkout}"
+
+class OrderSummaries(models.Model):
+    """
+    Read-optimised snapshot of a checkout, written in the checkout's transaction
+    and rewritten by refresh() when the checkout or its items change.
+
+    Holds everything order history needs so reads are a single indexed scan
+    on (user, checkout_date) with no joins. `lines` stores one compact
+    [checkout_item_id, product_id, product_name, product_price, quantity]
+    entry per item.
+    """
+    checkout = models.OneToOneField(Checkouts, on_delete=models.CASCADE, related_name='summary')
+    # Covered by the (user, checkout_date) index below
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='order_summaries',
+        db_index=False,
+    )
+    username = models.CharField(max_length=150)
+    cart_id = models.BigIntegerField()
+    checkout_date = models.DateTimeField()
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.PositiveIntegerField()
+    lines = models.JSONField(default=list)
+    # Set when the order's sales are added to the seller rollups (see rollups.py)
+    sales_recorded = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-checkout_date', '-id'], name='order_summary_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Order summary for checkout {self.checkout_id}"
+
+    @classmethod
+    def refresh(cls, checkout_id):
+        """
+        Rewrite a checkout's summary from its current row and items.
+
+        Lines the summary already held keep the name and price paid unless
+        their product changed; other lines take the product as it is now.
+        """
+        checkout = Checkouts.objects.select_related('cart__user').filter(pk=checkout_id).first()
+        if checkout is None:
+            # Deleted, and its summary with it
+            return
+        summary = cls.objects.filter(checkout=checkout).first()
+        previous = {line[0]: line for line in summary.lines} if summary else {}
+        lines = []
+        for item in checkout.checkoutitems_set.select_related('product').order_by('id'):
+            line = previous.get(item.id)
+            if line is not None and line[1] == item.product_id:
+                lines.append([item.id, item.product_id, line[2], line[3], item.quantity])
+            else:
+                lines.append([item.id, item.product_id, item.product.product_name, str(item.product.price), item.quantity])
+        cls.objects.update_or_create(checkout=checkout, defaults={
+            'user_id': checkout.cart.user_id,
+            'username': checkout.cart.user.username,
+            'cart_id': checkout.cart_id,
+            'checkout_date': checkout.checkout_date,
+            'total_amount': checkout.total_amount,
+            'item_count': len(lines),
+            'lines': lines,
+        })
+
+
+class SellerDailySales(models.Model):
+    """Units, revenue and distinct orders per seller and day, maintained by products/rollups.py"""
+    # Covered by the unique (seller, date) constraint
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_sales',
+        db_index=False,
+    )
+    date = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'date'], name='unique_seller_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"Sales of seller {self.seller_id} on {self.date}"
+
+
+class SellerProductDailySales(models.Model):
+    """Units, revenue and orders per seller, product and day, maintained by products/rollups.py"""
+    seller = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='product_daily_sales',
+        db_index=False,
+    )
+    product = models.ForeignKey(Products, on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Leads with (seller, date) so top-product queries over a date range use it
+            models.UniqueConstraint(fields=['seller', 'date', 'product'], name='unique_seller_product_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"Sales of product {self.product_id} on {self.date}"
+
+
+class IdempotencyRecords(models.Model):
+    """
+    The outcome of a request sent with an Idempotency-Key, replayed to retries.
+
+    `status_code` is null while the first request is still running.
+    """
+    scope = models.CharField(max_length=64)
+    key = models.CharField(max_length=255)
+    # Hash of method, path and payload: a key may not be reused for a different request
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    # The response headers a retry needs too, e.g. Location
+    response_headers = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='unique_idempotency_key_per_scope'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"Idempotency key {self.key} for {self.scope}"
+
+
+class Jobs(models.Model):
+    """
+    A queued unit of background work, run by the run_jobs command (see jobs.py).
+
+    While a job is running, `run_after` is the end of the worker's lease;
+    after a failure it is when the next try is due.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+    # Registered handler name, e.g. 'checkouts.completed'
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim due jobs oldest first
+            models.Index(fields=['status', 'run_after'], name='jobs_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.name})"
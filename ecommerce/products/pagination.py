@@ -0,0 +1,42 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ProductsPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request):
+        """Async counterpart of paginate_queryset, using acount() and async iteration"""
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        return [obj async for obj in self.page.object_list]
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key, newest first.
+
+    Each page is an indexed range scan from the cursor, so deep pages cost
+    the same as the first one.
+    """
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CreatedAtCursorPagination(IdCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CheckoutsCursorPagination(IdCursorPagination):
+    ordering = ('-checkout_date', '-id')
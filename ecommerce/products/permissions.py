@@ -0,0 +1,23 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsSellerOrStaff(BasePermission):
+    """Allow a seller's own reports (the `pk` in the URL) to that seller and to staff"""
+    message = 'You can only view your own seller reports.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_staff or str(user.id) == str(view.kwargs.get('pk'))
+
+
+class IsSellerAccount(BasePermission):
+    """Allow sellers and staff"""
+    message = 'Only sellers can manage a catalog.'
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_staff or user.role == 'seller'
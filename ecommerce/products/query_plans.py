@@ -0,0 +1,81 @@
+"""
+Query-plan checks for the hot paths.
+
+hot_queries() lists the lookups the API runs on every request, built the
+way the views build them. full_scans() runs EXPLAIN QUERY PLAN on one and
+reports any table it reads in full, so a dropped or unusable index fails
+the audit_query_plans command and the tests instead of slowing down
+production.
+
+Every table must be reached with an index SEARCH. The only exception is
+unfiltered pages, which walk an index in order (``SCAN t USING INDEX``)
+and stop at the page size. Only SQLite plans are checked; other planners
+pick sequential scans on small tables by design.
+"""
+import re
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.utils import timezone
+
+from .models import (
+    CartItems, Carts, CheckoutItems, Checkouts, Jobs, OrderSummaries, Products, SellerDailySales,
+    SellerProductDailySales, StockReservations
+)
+
+PAGE = 20
+
+# Ids don't need to exist: the plan depends on the query shape, not the data
+USER_ID = CART_ID = PRODUCT_ID = CHECKOUT_ID = 1
+
+
+def hot_queries(using='default'):
+    """Return [(label, queryset, is an unfiltered page)] for every hot-path query"""
+    User = get_user_model()
+    week_ago = date.today() - timedelta(days=7)
+    queries = [
+        ('products page', Products.objects.order_by('-created_at', '-id')[:PAGE], True),
+        ('products by seller', Products.objects.filter(seller_id=USER_ID).order_by('-created_at', '-id')[:PAGE], False),
+        ('low stock by seller', Products.objects.filter(seller_id=USER_ID, stock__lt=5).order_by('stock', 'id')[:50], False),
+        ('product by seller and sku', Products.objects.filter(seller_id=USER_ID, sku='SKU-1'), False),
+        ('product detail', Products.objects.filter(pk=PRODUCT_ID), False),
+        ('active cart', Carts.objects.with_items().filter(user_id=USER_ID, status='open'), False),
+        ('carts by user', Carts.objects.filter(user_id=USER_ID).order_by('-created_at', '-id')[:PAGE], False),
+        ('carts page', Carts.objects.order_by('-created_at', '-id')[:PAGE], True),
+        ('cart item by cart and product', CartItems.objects.filter(cart_id=CART_ID, product_id=PRODUCT_ID), False),
+        ('cart items in cart', CartItems.objects.filter(cart_id=CART_ID), False),
+        ('reservations in cart', StockReservations.objects.filter(cart_id=CART_ID), False),
+        ('expired reservations', StockReservations.objects.filter(expires_at__lte=timezone.now())[:1000], False),
+        ('checkouts by user', Checkouts.objects.filter(cart__user_id=USER_ID).order_by('-checkout_date', '-id')[:PAGE], False),
+        ('checkouts page', Checkouts.objects.order_by('-checkout_date', '-id')[:PAGE], True),
+        ('checkout by cart', Checkouts.objects.filter(cart_id=CART_ID), False),
+        ('checkout items in checkout', CheckoutItems.objects.filter(checkout_id=CHECKOUT_ID), False),
+        ('order history', OrderSummaries.objects.filter(user_id=USER_ID).order_by('-checkout_date', '-id')[:PAGE], False),
+        ('order summary', OrderSummaries.objects.filter(checkout_id=CHECKOUT_ID), False),
+        ('seller daily sales', SellerDailySales.objects.filter(seller_id=USER_ID, date__gte=week_ago), False),
+        ('seller product sales', SellerProductDailySales.objects.filter(seller_id=USER_ID, date__gte=week_ago), False),
+        ('due jobs', Jobs.objects.filter(status__in=['queued', 'running'], run_after__lte=timezone.now()).order_by('run_after', 'id')[:PAGE], False),
+        ('user by email', User.objects.filter(email='someone@example.com'), False),
+        ('user by username', User.objects.filter(username='someone'), False),
+    ]
+    return [(label, queryset.using(using), page) for label, queryset, page in queries]
+
+
+SCAN = re.compile(r'\bSCAN (\w+)(.*)')
+
+
+def full_scans(queryset, page=False):
+    """
+    Return (plan text, [tables the query reads in full]).
+
+    With `page`, walking a table through an index in order is allowed.
+    """
+    plan = queryset.explain()
+    if connections[queryset.db].vendor != 'sqlite':
+        return plan, []
+    tables = []
+    for match in map(SCAN.search, plan.splitlines()):
+        if match and not (page and 'USING' in match.group(2)):
+            tables.append(match.group(1))
+    return plan, tables
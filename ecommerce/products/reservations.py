@@ -0,0 +1,161 @@
+"""
+Stock reservations for open carts.
+
+Adding to a cart holds stock: Products.reserved counts the units held and a
+StockReservations row per (cart, product) records who holds them and until
+when. Holds are taken with one guarded UPDATE per change
+(``stock >= reserved + delta``), so concurrent writers can never reserve
+more than is on the shelf, and nothing reads the product rows first.
+
+Holds expire CART_RESERVATION_TTL seconds after the cart was last changed;
+release_expired() hands them back in bulk. Checkout turns a cart's holds
+into sales in the same statement that decrements stock.
+
+Callers run these functions inside transaction.atomic() so a failure rolls
+back any holds already taken.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CartItems, Products, StockReservations
+
+
+class InsufficientStock(Exception):
+    """Raised to roll back a transaction when products can't cover the requested quantities"""
+
+    def __init__(self, shortages=()):
+        super().__init__('Insufficient stock')
+        # [{'id', 'product_name', 'stock', 'available'}] when known
+        self.shortages = list(shortages)
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL)
+
+
+def sync_reservations(cart, product_ids=None):
+    """
+    Make the cart's holds match its items for `product_ids` (default: all).
+
+    Takes or releases the difference for each product and refreshes the
+    expiry of every hold in the cart. Raises InsufficientStock, listing the
+    products that could not be covered, if any increase fails.
+    """
+    items = CartItems.objects.filter(cart=cart)
+    held = cart.reservations.select_for_update()
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+        held = held.filter(product_id__in=product_ids)
+    wanted = dict(items.values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total'))
+    held = {reservation.product_id: reservation for reservation in held}
+
+    deltas = {
+        product_id: wanted.get(product_id, 0) - (held[product_id].quantity if product_id in held else 0)
+        for product_id in wanted.keys() | held.keys()
+    }
+    increases = {product_id: delta for product_id, delta in deltas.items() if delta > 0}
+    decreases = {product_id: delta for product_id, delta in deltas.items() if delta < 0}
+    if increases:
+        try:
+            with transaction.atomic():
+                if _adjust_reserved(increases, guarded=True) != len(increases):
+                    raise InsufficientStock()
+        except InsufficientStock:
+            # The savepoint is rolled back, so these are the levels before this call
+            available = Products.objects.filter(pk__in=increases).annotate(
+                available=F('stock') - F('reserved')
+            ).values('id', 'product_name', 'stock', 'available')
+            raise InsufficientStock(row for row in available if row['available'] < increases[row['id']])
+    if decreases:
+        _adjust_reserved(decreases)
+
+    expires_at = reservation_expiry()
+    to_create, to_update = [], []
+    for product_id, quantity in wanted.items():
+        reservation = held.get(product_id)
+        if reservation is None:
+            to_create.append(StockReservations(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at))
+        elif reservation.quantity != quantity:
+            reservation.quantity = quantity
+            to_update.append(reservation)
+    to_delete = [reservation.pk for product_id, reservation in held.items() if product_id not in wanted]
+
+    if to_create:
+        StockReservations.objects.bulk_create(to_create)
+    if to_update:
+        StockReservations.objects.bulk_update(to_update, ['quantity'])
+    if to_delete:
+        StockReservations.objects.filter(pk__in=to_delete).delete()
+    # Any change to the cart keeps all of its holds alive
+    cart.reservations.update(expires_at=expires_at)
+
+
+def release_cart(cart):
+    """Hand back everything the cart holds, e.g. before deleting it"""
+    held = dict(cart.reservations.select_for_update().values_list('product_id', 'quantity'))
+    if held:
+        _release(held)
+        cart.reservations.all().delete()
+
+
+def release_expired(now=None, batch_size=1000):
+    """Release expired holds in batches; returns how many reservations were released"""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            # Skip holds that a cart change or a checkout (which locks the cart) is renewing or converting
+            batch = list(
+                StockReservations.objects.select_for_update(skip_locked=True, of=('self', 'cart'))
+                .select_related('cart')
+                .only('id', 'product_id', 'quantity', 'cart__id')
+                .filter(expires_at__lte=now)[:batch_size]
+            )
+            if not batch:
+                return released
+            totals = defaultdict(int)
+            for reservation in batch:
+                totals[reservation.product_id] += reservation.quantity
+            _release(totals)
+            StockReservations.objects.filter(pk__in=[reservation.pk for reservation in batch]).delete()
+        released += len(batch)
+
+
+def reconcile_reserved():
+    """Recompute Products.reserved from the ledger, e.g. after carts were deleted in bulk"""
+    total = Coalesce(
+        Subquery(
+            StockReservations.objects.filter(product=OuterRef('pk'))
+            .values('product').annotate(total=Sum('quantity')).values('total')
+        ),
+        0,
+    )
+    return Products.objects.exclude(reserved=total).update(reserved=total)
+
+
+def _release(quantities):
+    """Subtract {product id: quantity} from Products.reserved"""
+    _adjust_reserved({product_id: -quantity for product_id, quantity in quantities.items()})
+
+
+def _adjust_reserved(deltas, guarded=False):
+    """
+    Add {product id: delta} to Products.reserved in one statement.
+
+    With `guarded`, rows whose stock can't cover the new total are left
+    alone. Returns the number of rows updated.
+    """
+    delta = Case(
+        *[When(pk=product_id, then=Value(value)) for product_id, value in deltas.items()],
+        output_field=IntegerField(),
+    )
+    products = Products.objects.filter(pk__in=deltas)
+    if guarded:
+        products = products.filter(stock__gte=F('reserved') + delta)
+    return products.update(reserved=F('reserved') + delta)
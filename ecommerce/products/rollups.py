@@ -0,0 +1,176 @@
+"""
+Seller sales rollups.
+
+SellerDailySales (per seller and day) and SellerProductDailySales (per
+seller, product and day) hold units, revenue and order counts, so seller
+analytics never scan CheckoutItems. The job each checkout queues adds its
+order through record_order_sales(), which flips the summary's
+sales_recorded flag in the same transaction so a replayed job adds
+nothing; rebuild_rollups() recomputes them from OrderSummaries, whose
+lines keep the price paid, in one transaction.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps as global_apps
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+SELLER_KEY = ('seller_id', 'date')
+PRODUCT_KEY = ('seller_id', 'product_id', 'date')
+
+
+def _zero():
+    return {'units': 0, 'revenue': Decimal('0'), 'orders': 0}
+
+
+def aggregate_orders(orders):
+    """
+    Fold orders into rollup increments.
+
+    `orders` yields (checkout_date, [(product_id, seller_id, quantity, price), ...]).
+    Returns ({(seller_id, date): totals}, {(seller_id, product_id, date): totals}).
+    """
+    per_seller, per_product = defaultdict(_zero), defaultdict(_zero)
+    for checkout_date, lines in orders:
+        day = timezone.localdate(checkout_date)
+        seller_keys, product_keys = set(), set()
+        for product_id, seller_id, quantity, price in lines:
+            revenue = Decimal(price) * quantity
+            for totals in (per_seller[(seller_id, day)], per_product[(seller_id, product_id, day)]):
+                totals['units'] += quantity
+                totals['revenue'] += revenue
+            seller_keys.add((seller_id, day))
+            product_keys.add((seller_id, product_id, day))
+        # An order counts once per seller and once per product, however many lines it has
+        for key in seller_keys:
+            per_seller[key]['orders'] += 1
+        for key in product_keys:
+            per_product[key]['orders'] += 1
+    return per_seller, per_product
+
+
+def apply_increments(model, key_fields, increments):
+    """
+    Add {key: totals} to `model`, creating missing rows.
+
+    Batched rather than per key: inserts of the missing keys, one select
+    of the rows, then bulk UPDATEs of F() increments, 500 rows each, so
+    concurrent checkouts add up instead of overwriting each other. A
+    checkout's few keys take three statements.
+    """
+    if not increments:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in increments],
+        ignore_conflicts=True,
+    )
+    candidates = model.objects.filter(**{
+        f'{field}__in': {key[position] for key in increments}
+        for position, field in enumerate(key_fields)
+    }).only('pk', *key_fields)
+
+    rows = []
+    for row in candidates:
+        totals = increments.get(tuple(getattr(row, field) for field in key_fields))
+        if totals is None:
+            continue
+        row.units = F('units') + totals['units']
+        row.revenue = F('revenue') + totals['revenue']
+        row.orders = F('orders') + totals['orders']
+        rows.append(row)
+    model.objects.bulk_update(rows, ['units', 'revenue', 'orders'], batch_size=500)
+
+
+def record_checkout_sales(checkout_date, lines, apps=global_apps):
+    """Add one checkout's [(product_id, seller_id, quantity, price)] lines to the rollups"""
+    per_seller, per_product = aggregate_orders([(checkout_date, lines)])
+    apply_increments(apps.get_model('products', 'SellerDailySales'), SELLER_KEY, per_seller)
+    apply_increments(apps.get_model('products', 'SellerProductDailySales'), PRODUCT_KEY, per_product)
+
+
+def summary_orders(summaries, apps=global_apps):
+    """
+    Turn (checkout_date, summary lines) pairs into aggregate_orders() input.
+
+    Summary lines hold [item_id, product_id, product_name, price, quantity];
+    products deleted since are left out.
+    """
+    summaries = list(summaries)
+    Products = apps.get_model('products', 'Products')
+    sellers = dict(
+        Products.objects.filter(id__in={line[1] for _, lines in summaries for line in lines})
+        .values_list('id', 'seller_id')
+    )
+    return [
+        (checkout_date, [(line[1], sellers[line[1]], line[4], line[3]) for line in lines if line[1] in sellers])
+        for checkout_date, lines in summaries
+    ]
+
+
+def record_order_sales(checkout_id):
+    """Add a checkout's order summary to the rollups unless it already is; returns whether it was added"""
+    OrderSummaries = global_apps.get_model('products', 'OrderSummaries')
+    with transaction.atomic():
+        if not OrderSummaries.objects.filter(checkout_id=checkout_id, sales_recorded=False).update(sales_recorded=True):
+            return False
+        summary = OrderSummaries.objects.values_list('checkout_date', 'lines').get(checkout_id=checkout_id)
+        [(checkout_date, lines)] = summary_orders([summary])
+        record_checkout_sales(checkout_date, lines)
+    return True
+
+
+def roll_up_summaries(last_id=None, chunk_size=1000, apps=global_apps, log=None):
+    """
+    Add OrderSummaries up to `last_id` (default all) to the rollups, reading `chunk_size` orders at a time.
+
+    Run it inside the caller's transaction. Doesn't touch sales_recorded;
+    returns the number of orders processed.
+    """
+    OrderSummaries = apps.get_model('products', 'OrderSummaries')
+    SellerDailySales = apps.get_model('products', 'SellerDailySales')
+    SellerProductDailySales = apps.get_model('products', 'SellerProductDailySales')
+
+    summaries = OrderSummaries.objects.all()
+    if last_id is not None:
+        summaries = summaries.filter(id__lte=last_id)
+
+    processed, cursor = 0, 0
+    while True:
+        chunk = list(
+            summaries.filter(id__gt=cursor)
+            .order_by('id')
+            .values_list('id', 'checkout_date', 'lines')[:chunk_size]
+        )
+        if not chunk:
+            return processed
+        cursor = chunk[-1][0]
+
+        per_seller, per_product = aggregate_orders(
+            summary_orders(((checkout_date, lines) for _, checkout_date, lines in chunk), apps=apps)
+        )
+        apply_increments(SellerDailySales, SELLER_KEY, per_seller)
+        apply_increments(SellerProductDailySales, PRODUCT_KEY, per_product)
+        processed += len(chunk)
+        if log:
+            log(f'{processed} orders rolled up')
+
+
+def rebuild_rollups(chunk_size=1000, log=None):
+    """
+    Recompute both rollup tables from OrderSummaries in one transaction.
+
+    Dashboards keep reading the old totals until the new ones commit, never
+    empty or partial tables. Summaries are read `chunk_size` at a time and
+    marked recorded, so their pending jobs add nothing; orders placed later
+    are counted by their own job. Returns the number of orders processed.
+    """
+    OrderSummaries = global_apps.get_model('products', 'OrderSummaries')
+
+    with transaction.atomic():
+        last_id = OrderSummaries.objects.aggregate(last=Max('id'))['last'] or 0
+        global_apps.get_model('products', 'SellerDailySales').objects.all().delete()
+        global_apps.get_model('products', 'SellerProductDailySales').objects.all().delete()
+        OrderSummaries.objects.filter(id__lte=last_id, sales_recorded=False).update(sales_recorded=True)
+        return roll_up_summaries(last_id, chunk_size, log=log)
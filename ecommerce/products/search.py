@@ -0,0 +1,82 @@
+"""
+Full-text search over products.
+
+On SQLite the catalog is mirrored into an FTS5 table (see migration 0004)
+which triggers keep in sync with ``products_products``. Other backends fall
+back to a case-insensitive substring match.
+
+SQLite rebuilds a table to add most columns, dropping its triggers, so
+migrations that add a Products field must run `reinstall_fts_triggers`.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+FTS_TABLE = 'products_products_fts'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_TRIGGERS_SQL = [
+    f"""
+    CREATE TRIGGER products_products_fts_ai AFTER INSERT ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, product_name, description)
+        VALUES (new.id, new.product_name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER products_products_fts_ad AFTER DELETE ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, description)
+        VALUES ('delete', old.id, old.product_name, old.description);
+    END
+    """,
+    # Only text changes touch the index, not stock or reservation updates
+    f"""
+    CREATE TRIGGER products_products_fts_au AFTER UPDATE OF product_name, description ON products_products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, product_name, description)
+        VALUES ('delete', old.id, old.product_name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, product_name, description)
+        VALUES (new.id, new.product_name, new.description);
+    END
+    """,
+]
+
+
+def reinstall_fts_triggers(apps, schema_editor):
+    """RunPython operation: recreate the sync triggers and resync the index"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in ('ai', 'ad', 'au'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS products_products_fts_{name}')
+    for statement in FTS_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every word must match as a prefix"""
+    tokens = _TOKEN_RE.findall(text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(queryset, text):
+    """Filter `queryset` to products matching `text`, best matches first"""
+    if connections[queryset.db].vendor != 'sqlite':
+        return queryset.filter(
+            Q(product_name__icontains=text) | Q(description__icontains=text)
+        )
+
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+
+    # `rank` is configured in the migration to weight product_name above description
+    return queryset.extra(
+        select={'search_rank': f'{FTS_TABLE}.rank'},
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = products_products.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match],
+    ).order_by('search_rank', '-created_at')
@@ -1,12 +1,37 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Products, Carts, CartItems, Checkouts, CheckoutItems
+from rest_framework.validators import UniqueTogetherValidator
+from .fieldsets import SparseFieldsetMixin, join_path
+from .models import Products, Carts, CartItems, Checkouts, CheckoutItems, OrderSummaries
+
+
+class UniqueSkuPerSellerValidator(UniqueTogetherValidator):
+    """
+    The (seller, sku) check, skipped for products without a sku.
+
+    Like the database constraint, where NULLs never collide, a seller may
+    have any number of them; DRF's own validator would match them all when
+    a product moves to another seller.
+    """
 
+    def __call__(self, attrs, serializer):
+        sku = attrs['sku'] if 'sku' in attrs else getattr(serializer.instance, 'sku', None)
+        if sku is None:
+            return
+        super().__call__(attrs, serializer)
 
-class ProductsSerializer(serializers.ModelSerializer):
+
+class ProductsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Products
-        fields = ['id', 'product_name', 'description', 'price', 'stock', 'created_at', 'seller']
-        read_only_fields = ['created_at']
+        fields = ['id', 'product_name', 'description', 'price', 'stock', 'created_at', 'updated_at', 'seller', 'sku']
+        read_only_fields = ['created_at', 'updated_at']
+        extra_kwargs = {'sku': {'required': False, 'default': None}}
+        validators = [UniqueSkuPerSellerValidator(queryset=Products.objects.all(), fields=['seller', 'sku'])]
 
     def validate_price(self, value):
         if value <= 0:
@@ -18,13 +43,29 @@ class ProductsSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Product stock cannot be negative")
         return value
 
+    def validate_sku(self, value):
+        # Products without a code store NULL, which never collides
+        return value or None
+
+
+class ProductImportRowSerializer(ProductsSerializer):
+    """One row of a bulk import; the seller comes from the upload and the sku is the upsert key"""
 
-class CartItemSerializer(serializers.ModelSerializer):
+    class Meta(ProductsSerializer.Meta):
+        fields = ['sku', 'product_name', 'description', 'price', 'stock']
+        extra_kwargs = {'sku': {'required': True, 'allow_null': False, 'allow_blank': False}}
+        # The upsert resolves (seller, sku) conflicts
+        validators = []
+
+
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.product_name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     total_price = serializers.SerializerMethodField()
     user_id = serializers.IntegerField(write_only=True, required=False, help_text="User ID (check /api/users/ for valid IDs)")
 
+    field_lookups = {'total_price': ('quantity', 'product__price')}
+
     class Meta:
         model = CartItems
         fields = ['id', 'cart', 'product', 'product_name', 'product_price', 'quantity', 'total_price', 'user_id']
@@ -41,30 +82,88 @@ class CartItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True, source='cartitems_set')
     total_items = serializers.SerializerMethodField()
     cart_total = serializers.SerializerMethodField()
     username = serializers.CharField(source='user.username', read_only=True)
 
+    # Totals are annotated by the views (see CartsQuerySet)
+    field_lookups = {'total_items': (), 'cart_total': ()}
+
     class Meta:
         model = Carts
-        fields = ['id', 'user', 'username', 'created_at', 'items', 'total_items', 'cart_total']
-        read_only_fields = ['created_at']
+        fields = ['id', 'user', 'username', 'created_at', 'status', 'version', 'items', 'total_items', 'cart_total']
+        read_only_fields = ['created_at', 'status', 'version']
+
+    def validate_user(self, value):
+        if self.instance is not None and self.instance.status != 'open':
+            return value
+        open_carts = Carts.objects.filter(user=value, status='open')
+        if self.instance is not None:
+            open_carts = open_carts.exclude(pk=self.instance.pk)
+        if open_carts.exists():
+            raise serializers.ValidationError("User already has an open cart")
+        return value
 
     def get_total_items(self, obj):
+        # `items_count`/`items_total` are annotated by Carts.objects.with_items()
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.cartitems_set.count()
 
     def get_cart_total(self, obj):
+        if hasattr(obj, 'items_total'):
+            return obj.items_total
         total = sum(item.product.price * item.quantity for item in obj.cartitems_set.all())
         return total
 
 
-class CheckoutItemSerializer(serializers.ModelSerializer):
+class CartOperationSerializer(serializers.Serializer):
+    OP_CHOICES = ('add', 'set', 'remove')
+
+    op = serializers.ChoiceField(choices=OP_CHOICES)
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'add':
+            attrs.setdefault('quantity', 1)
+            if attrs['quantity'] <= 0:
+                raise serializers.ValidationError({"quantity": "Quantity must be greater than 0"})
+        elif attrs['op'] == 'set' and 'quantity' not in attrs:
+            raise serializers.ValidationError({"quantity": "Quantity is required for set operations"})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+
+class CartSyncItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartSyncSerializer(serializers.Serializer):
+    """The cart version the client last saw and the full item state it wants"""
+    version = serializers.IntegerField(min_value=0)
+    items = CartSyncItemSerializer(many=True)
+
+    def validate_items(self, value):
+        products = [item['product'] for item in value]
+        if len(products) != len(set(products)):
+            raise serializers.ValidationError("Each product may only appear once")
+        return value
+
+
+class CheckoutItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.product_name', read_only=True)
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
     total_price = serializers.SerializerMethodField()
 
+    field_lookups = {'total_price': ('quantity', 'product__price')}
+
     class Meta:
         model = CheckoutItems
         fields = ['id', 'checkout', 'product', 'product_name', 'product_price', 'quantity', 'total_price']
@@ -73,20 +172,110 @@ class CheckoutItemSerializer(serializers.ModelSerializer):
         return obj.product.price * obj.quantity
 
 
-class CheckoutSerializer(serializers.ModelSerializer):
+class CheckoutSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CheckoutItemSerializer(many=True, read_only=True, source='checkoutitems_set')
     username = serializers.CharField(source='cart.user.username', read_only=True)
     total_items = serializers.SerializerMethodField()
 
+    field_lookups = {'total_items': ()}
+
     class Meta:
         model = Checkouts
         fields = ['id', 'cart', 'username', 'total_amount', 'checkout_date', 'items', 'total_items']
         read_only_fields = ['checkout_date']
 
     def get_total_items(self, obj):
+        # `items_count` is annotated by Checkouts.objects.with_items()
+        if hasattr(obj, 'items_count'):
+            return obj.items_count
         return obj.checkoutitems_set.count()
 
     def validate_total_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Total amount must be greater than 0")
         return value
+
+
+class OrderSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Renders an order summary in the same shape as CheckoutSerializer"""
+    id = serializers.IntegerField(source='checkout_id', read_only=True)
+    cart = serializers.IntegerField(source='cart_id', read_only=True)
+    items = serializers.SerializerMethodField()
+    total_items = serializers.IntegerField(source='item_count', read_only=True)
+
+    field_lookups = {'items': ('checkout', 'lines')}
+
+    class Meta:
+        model = OrderSummaries
+        fields = ['id', 'cart', 'username', 'total_amount', 'checkout_date', 'items', 'total_items']
+
+    def get_items(self, obj):
+        items = [
+            {
+                'id': item_id,
+                'checkout': obj.checkout_id,
+                'product': product_id,
+                'product_name': product_name,
+                'product_price': product_price,
+                'quantity': quantity,
+                'total_price': Decimal(product_price) * quantity,
+            }
+            for item_id, product_id, product_name, product_price, quantity in obj.lines
+        ]
+        if self.fieldset is None:
+            return items
+        path = join_path(self.fieldset_path, 'items')
+        return [{key: value for key, value in item.items() if self.fieldset.keeps(path, key)} for item in items]
+
+
+class SellerAnalyticsQuerySerializer(serializers.Serializer):
+    """Validates the query string of the seller analytics endpoint"""
+    INTERVAL_CHOICES = ('day', 'week', 'month')
+    DEFAULT_DAYS = 30
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=INTERVAL_CHOICES, default='day')
+    top = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs):
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=self.DEFAULT_DAYS - 1))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({"start": "Start date must not be after the end date"})
+        return attrs
+
+
+class SalesTotalsSerializer(serializers.Serializer):
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    orders = serializers.IntegerField()
+
+
+class SalesPeriodSerializer(SalesTotalsSerializer):
+    period = serializers.DateField()
+
+
+class TopProductSerializer(SalesTotalsSerializer):
+    product = serializers.IntegerField()
+    product_name = serializers.CharField(source='product__product_name')
+
+
+class SellerDashboardQuerySerializer(serializers.Serializer):
+    """Validates the query string of the seller dashboard endpoint"""
+    low_stock = serializers.IntegerField(min_value=1, default=lambda: settings.SELLER_LOW_STOCK_THRESHOLD)
+
+
+class InventorySummarySerializer(serializers.Serializer):
+    products = serializers.IntegerField()
+    total_stock = serializers.IntegerField()
+    inventory_value = serializers.DecimalField(max_digits=14, decimal_places=2)
+    low_stock = serializers.IntegerField()
+    units_sold = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class LowStockProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Products
+        fields = ['id', 'product_name', 'sku', 'stock', 'reserved']
@@ -0,0 +1,42 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .models import CheckoutItems, Checkouts, OrderSummaries, Products
+
+
+@receiver(post_save, sender=Products)
+@receiver(post_delete, sender=Products)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Bump after commit so readers can't cache pre-commit rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Checkouts)
+def refresh_summary_of_checkout(sender, instance, created, **kwargs):
+    # Checkout writes the summary of a new order itself
+    if not created:
+        transaction.on_commit(partial(OrderSummaries.refresh, instance.pk))
+
+
+@receiver(post_save, sender=CheckoutItems)
+@receiver(post_delete, sender=CheckoutItems)
+def refresh_summary_of_items(sender, instance, **kwargs):
+    # After commit, when a deleted checkout is gone instead of half-deleted
+    transaction.on_commit(partial(OrderSummaries.refresh, instance.checkout_id))
+
+
+@receiver(pre_save, sender=CheckoutItems)
+def refresh_summary_of_previous_checkout(sender, instance, **kwargs):
+    # An item moved to another checkout leaves the old one's summary too
+    if instance.pk is None:
+        return
+    previous = (
+        CheckoutItems.objects.filter(pk=instance.pk).exclude(checkout_id=instance.checkout_id)
+        .values_list('checkout_id', flat=True).first()
+    )
+    if previous is not None:
+        transaction.on_commit(partial(OrderSummaries.refresh, previous))
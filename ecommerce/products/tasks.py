@@ -0,0 +1,9 @@
+"""Background job handlers (see jobs.py); each must be safe to run more than once"""
+from .jobs import handler
+from .rollups import record_order_sales
+
+
+@handler('checkouts.completed')
+def checkout_completed(checkout_id):
+    """Work a checkout leaves for later: adding its sales to the seller rollups"""
+    record_order_sales(checkout_id)
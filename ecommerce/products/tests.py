@@ -1,3 +1,864 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from ecommerce.db_router import STICKY_COOKIE, PrimaryReplicaRouter, PrimaryStickinessMiddleware, use_primary
+from ecommerce.metrics import registry
+
+from .admin import PaginatedInlineFormSet
+from .cache import bump_catalog_version, cached_catalog_response
+from .fragments import FRAGMENT_CACHE, FRAGMENT_FIELDS, product_fragments
+from .idempotency import REPLAYED_HEADER, idempotent, purge_records
+from .jobs import HANDLERS, claim, enqueue, load_handlers, run_job
+from .models import (
+    CartItems, Carts, CheckoutItems, Checkouts, IdempotencyRecords, Jobs, OrderSummaries, Products, SellerDailySales,
+    StockReservations,
+)
+from .query_plans import full_scans, hot_queries
+from .reservations import reconcile_reserved, release_expired
+from .rollups import rebuild_rollups
+from users.serializers import CustomTokenObtainPairSerializer
+
+
+def auth(user):
+    """Authorization header of an access token for `user`"""
+    return {'HTTP_AUTHORIZATION': f'Bearer {CustomTokenObtainPairSerializer.get_token(user).access_token}'}
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        for label, queryset, page in hot_queries():
+            with self.subTest(label):
+                plan, tables = full_scans(queryset, page)
+                self.assertEqual(tables, [], f'{label} reads whole tables:\n{plan}')
+
+    def test_full_scan_is_detected(self):
+        plan, tables = full_scans(Products.objects.filter(description='x'))
+        self.assertEqual(tables, ['products_products'], plan)
+
+    def test_filtered_index_walk_is_a_full_scan(self):
+        # Ordered by an index but filtered on an unindexed column: every row is visited
+        queryset = Products.objects.filter(description='x').order_by('-created_at', '-id')[:20]
+        self.assertEqual(full_scans(queryset)[1], ['products_products'])
+        self.assertEqual(full_scans(queryset, page=True)[1], [])
+
+    def test_audit_command_passes(self):
+        call_command('audit_query_plans', verbosity=0)
+
+
+class AdminQueryTests(TestCase):
+    """Admin pages must cost the same number of queries however many rows there are"""
+    # Session, user, the page and its count, plus what the page itself needs
+    MAX_CHANGELIST_QUERIES = 8
+
+    CHANGELISTS = ['products', 'carts', 'cartitems', 'checkouts', 'checkoutitems']
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_superuser(email='admin@example.com', username='admin', password=None)
+        cls.seller = User.objects.create_user(
+            email='seller@example.com', username='seller', password=None, role='seller'
+        )
+        cls.cart = cls.add_orders(3)
+
+    @classmethod
+    def add_orders(cls, count):
+        """Create `count` buyers with an open cart and a checkout; returns the last open cart"""
+        User = get_user_model()
+        start = User.objects.count()
+        for number in range(start, start + count):
+            buyer = User.objects.create_user(email=f'buyer{number}@example.com', username=f'buyer{number}', password=None)
+            product = Products.objects.create(
+                product_name=f'Product {number}', description='d', price=1, stock=10, seller=cls.seller
+            )
+            cart = Carts.objects.create(user=buyer)
+            CartItems.objects.create(cart=cart, product=product, quantity=1)
+            checkout = Checkouts.objects.create(cart=Carts.objects.create(user=buyer, status='checked_out'), total_amount=1)
+            CheckoutItems.objects.create(checkout=checkout, product=product, quantity=1)
+        return cart
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(captured.captured_queries)
+
+    def test_changelist_queries_are_capped(self):
+        urls = [reverse(f'admin:products_{model}_changelist') for model in self.CHANGELISTS]
+        few = [self.count_queries(url) for url in urls]
+        self.add_orders(30)
+        for url, before in zip(urls, few):
+            with self.subTest(url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, before, f'{url} makes queries per row')
+                self.assertLessEqual(queries, self.MAX_CHANGELIST_QUERIES)
+
+    def test_inline_shows_one_page(self):
+        url = reverse('admin:products_carts_change', args=[self.cart.pk])
+        for number in range(PaginatedInlineFormSet.per_page * 2):
+            product = Products.objects.create(product_name=f'Extra {number}', description='d', price=1, stock=1, seller=self.seller)
+            CartItems.objects.create(cart=self.cart, product=product, quantity=1)
+        second_page = self.client.get(url, {'cartitems_set-page': 2, '_changelist_filters': 'status=open'})
+        formset = second_page.context['inline_admin_formsets'][0].formset
+        self.assertEqual(formset.page.number, 2)
+        # Paging keeps the rest of the query string
+        self.assertEqual(formset.next_page_url, '?cartitems_set-page=3&_changelist_filters=status%3Dopen')
+        self.assertContains(second_page, 'href="?cartitems_set-page=1&amp;_changelist_filters=status%3Dopen"')
+        full_page = self.count_queries(url)
+
+        CartItems.objects.create(
+            cart=self.cart,
+            product=Products.objects.create(product_name='One more', description='d', price=1, stock=1, seller=self.seller),
+            quantity=1,
+        )
+        self.assertEqual(self.count_queries(url), full_page)
+
+
+class ProductSkuTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='a@example.com', username='a', password=None, role='seller')
+        cls.other = User.objects.create_user(email='b@example.com', username='b', password=None, role='seller')
+        Products.objects.create(product_name='Other', description='d', price=1, stock=1, seller=cls.other)
+        Products.objects.create(product_name='Coded', description='d', price=1, stock=1, seller=cls.other, sku='SKU-1')
+
+    def create_product(self, sku=None):
+        return Products.objects.create(product_name='Mine', description='d', price=1, stock=1, seller=self.seller, sku=sku)
+
+    def test_product_without_sku_moves_to_seller_with_one(self):
+        product = self.create_product()
+        url = reverse('products-detail', args=[product.pk])
+        response = self.client.patch(url, {'seller': self.other.pk}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.put(url, {
+            'product_name': 'Mine', 'description': 'd', 'price': '1.00', 'stock': 1, 'seller': self.seller.pk,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_sku_stays_unique_per_seller(self):
+        product = self.create_product(sku='SKU-1')
+        response = self.client.patch(
+            reverse('products-detail', args=[product.pk]), {'seller': self.other.pk}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class CartQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.cart = Carts.objects.create(user=cls.buyer)
+
+    def add_items(self, count):
+        for number in range(count):
+            product = Products.objects.create(
+                product_name=f'Product {number}', description='d', price=1, stock=10, seller=self.seller
+            )
+            CartItems.objects.create(cart=self.cart, product=product, quantity=1)
+
+    def count_queries(self, method):
+        url = reverse('carts-detail', args=[self.cart.pk])
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url, {'user': self.buyer.pk}, content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['total_items'], self.cart.cartitems_set.count())
+        return len(captured.captured_queries)
+
+    def test_update_queries_dont_grow_with_items(self):
+        self.add_items(1)
+        few = {method: self.count_queries(method) for method in ('put', 'patch')}
+        self.add_items(10)
+        for method, before in few.items():
+            with self.subTest(method):
+                self.assertEqual(self.count_queries(method), before)
+
+
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyers = [
+            User.objects.create_user(email=f'buyer{number}@example.com', username=f'buyer{number}', password=None)
+            for number in range(2)
+        ]
+        cls.product = Products.objects.create(product_name='Last one', description='d', price='4.00', stock=1, seller=cls.seller)
+
+    def cart_with(self, buyer, quantity=1):
+        # Without holds, as when both buyers added the product before either reserved it
+        cart = Carts.objects.get_active(buyer.pk)
+        CartItems.objects.create(cart=cart, product=self.product, quantity=quantity)
+        return cart
+
+    def check_out(self, cart):
+        return self.client.post(reverse('checkouts-list'), {'cart': cart.pk}, content_type='application/json')
+
+    def test_last_unit_is_sold_once(self):
+        first, second = (self.cart_with(buyer) for buyer in self.buyers)
+        self.assertEqual(self.check_out(first).status_code, 201)
+        response = self.check_out(second)
+        self.assertEqual(response.status_code, 400)
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.reserved), (0, 0))
+        self.assertEqual(list(Checkouts.objects.values_list('cart', flat=True)), [first.pk])
+        # The losing cart is left as it was
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.cartitems_set.count()), ('open', 1))
+
+    def test_insufficient_stock_response(self):
+        response = self.check_out(self.cart_with(self.buyers[0], quantity=3))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'error': 'Insufficient stock for some items in the cart.',
+            'insufficient_stock': [{'id': self.product.pk, 'product_name': 'Last one', 'stock': 1, 'available': 1}],
+        })
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_checkout_writes_summary_and_opens_a_cart(self):
+        buyer = self.buyers[0]
+        cart = self.cart_with(buyer)
+        response = self.check_out(cart)
+        self.assertEqual(response.status_code, 201, response.content)
+
+        summary = OrderSummaries.objects.get(checkout_id=response.json()['id'])
+        self.assertEqual((summary.user_id, summary.cart_id, summary.item_count), (buyer.pk, cart.pk, 1))
+        self.assertEqual(summary.lines[0][1:], [self.product.pk, 'Last one', '4.00', 1])
+
+        cart.refresh_from_db()
+        self.assertEqual((cart.status, cart.cartitems_set.count()), ('checked_out', 0))
+        fresh = Carts.objects.get(user=buyer, status='open')
+        self.assertFalse(fresh.cartitems_set.exists())
+
+
+class ReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyers = [
+            User.objects.create_user(email=f'buyer{number}@example.com', username=f'buyer{number}', password=None)
+            for number in range(2)
+        ]
+        cls.product = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=3, seller=cls.seller)
+
+    def add(self, buyer, quantity):
+        cart = Carts.objects.get_active(buyer.pk)
+        return self.client.post(
+            reverse('carts-add-item', args=[cart.pk]), {'product': self.product.pk, 'quantity': quantity},
+            content_type='application/json',
+        )
+
+    def reserved(self):
+        self.product.refresh_from_db()
+        return self.product.reserved
+
+    def test_holds_cover_only_unreserved_stock(self):
+        self.assertEqual(self.add(self.buyers[0], 2).status_code, 201)
+        response = self.add(self.buyers[1], 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['insufficient_stock'],
+            [{'id': self.product.pk, 'product_name': 'Lamp', 'stock': 3, 'available': 1}],
+        )
+        self.assertEqual(self.reserved(), 2)
+        self.assertFalse(Carts.objects.get_active(self.buyers[1].pk).cartitems_set.exists())
+
+    def test_removing_an_item_releases_its_hold(self):
+        item_id = self.add(self.buyers[0], 2).json()['id']
+        response = self.client.delete(reverse('cart-items-detail', args=[item_id]))
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.reserved(), 0)
+        self.assertFalse(StockReservations.objects.exists())
+
+    def test_expired_holds_are_released(self):
+        self.add(self.buyers[0], 2)
+        self.assertEqual(release_expired(), 0)
+        later = timezone.now() + timedelta(seconds=settings.CART_RESERVATION_TTL + 1)
+        self.assertEqual(release_expired(now=later), 1)
+        self.assertEqual(self.reserved(), 0)
+        self.assertFalse(StockReservations.objects.exists())
+
+    def test_reconcile_repairs_drifted_reserved(self):
+        self.add(self.buyers[0], 2)
+        Products.objects.filter(pk=self.product.pk).update(reserved=3)
+        self.assertEqual(reconcile_reserved(), 1)
+        self.assertEqual(self.reserved(), 2)
+        self.assertEqual(reconcile_reserved(), 0)
+
+    def test_closed_cart_takes_no_changes(self):
+        cart = Carts.objects.create(user=self.buyers[0], status='checked_out')
+        item = CartItems.objects.create(cart=cart, product=self.product, quantity=1)
+        requests = [
+            ('post', reverse('carts-add-item', args=[cart.pk]), {'product': self.product.pk}),
+            ('patch', reverse('cart-items-detail', args=[item.pk]), {'quantity': 2}),
+            ('delete', reverse('cart-items-detail', args=[item.pk]), None),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method):
+                response = getattr(self.client, method)(url, data, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 1)
+        self.assertEqual(self.reserved(), 0)
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.product = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+
+    def add(self, key, quantity=1):
+        return self.client.post(
+            reverse('cart-items-list'), {'user_id': self.buyer.pk, 'product': self.product.pk, 'quantity': quantity},
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def quantity(self):
+        return CartItems.objects.get(product=self.product).quantity
+
+    def test_retry_gets_the_stored_response(self):
+        first = self.add('key-1')
+        retry = self.add('key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry[REPLAYED_HEADER], 'true')
+        self.assertEqual(self.quantity(), 1)
+
+    def test_key_reused_for_another_request_is_rejected(self):
+        self.add('key-1')
+        self.assertEqual(self.add('key-1', quantity=2).status_code, 422)
+        self.assertEqual(self.quantity(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+    def test_duplicate_of_a_running_request_is_told_to_retry(self):
+        self.add('key-1')
+        IdempotencyRecords.objects.update(status_code=None, response_body=None)
+        response = self.add('key-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.quantity(), 1)
+
+    def test_headers_are_replayed(self):
+        class CreateView(APIView):
+            @idempotent
+            def post(self, request):
+                return Response({'id': 7}, status=201, headers={'Location': '/things/7/', 'X-Other': 'x'})
+
+        def request():
+            return CreateView.as_view()(APIRequestFactory().post('/things/', {}, format='json', HTTP_IDEMPOTENCY_KEY='key-1'))
+
+        request()
+        retry = request()
+        self.assertEqual((retry.status_code, retry['Location']), (201, '/things/7/'))
+        self.assertFalse(retry.has_header('X-Other'))
+
+    def test_record_purged_while_running_keeps_the_response(self):
+        class CreateView(APIView):
+            @idempotent
+            def post(self, request):
+                purge_records(max_records=0)
+                return Response({'id': 7}, status=201)
+
+        response = CreateView.as_view()(APIRequestFactory().post('/things/', {}, format='json', HTTP_IDEMPOTENCY_KEY='key-1'))
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(IdempotencyRecords.objects.exists())
+
+
+class CartSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.lamp = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+        cls.desk = Products.objects.create(product_name='Desk', description='d', price='40.00', stock=10, seller=cls.seller)
+
+    def setUp(self):
+        self.cart = Carts.objects.get_active(self.buyer.pk)
+
+    def sync(self, version, items):
+        return self.client.post(
+            reverse('carts-sync', args=[self.cart.pk]),
+            {'version': version, 'items': [{'product': product.pk, 'quantity': quantity} for product, quantity in items]},
+            content_type='application/json',
+        )
+
+    def items(self):
+        return dict(self.cart.cartitems_set.values_list('product_id', 'quantity'))
+
+    def test_sync_writes_the_difference_and_bumps_the_version(self):
+        response = self.sync(0, [(self.lamp, 2), (self.desk, 1)])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['version'], 1)
+
+        response = self.sync(1, [(self.lamp, 3)])
+        self.assertEqual(response.json()['version'], 2)
+        self.assertEqual(self.items(), {self.lamp.pk: 3})
+        self.assertEqual(self.sync(2, [(self.lamp, 3)]).json(), {'unchanged': True, 'version': 2})
+
+    def test_stale_version_is_rejected_with_the_current_cart(self):
+        self.sync(0, [(self.lamp, 2)])
+        # Another device still holds version 0
+        response = self.sync(0, [(self.desk, 1)])
+        self.assertEqual(response.status_code, 409)
+        cart = response.json()['cart']
+        self.assertEqual(cart['version'], 1)
+        self.assertEqual([(item['product'], item['quantity']) for item in cart['items']], [(self.lamp.pk, 2)])
+        self.assertEqual(self.items(), {self.lamp.pk: 2})
+
+    def test_conflicting_writes_take_turns(self):
+        # Each write moves the version on, so only one of two clients that read the same version wins
+        self.client.post(
+            reverse('carts-add-item', args=[self.cart.pk]), {'product': self.desk.pk}, content_type='application/json'
+        )
+        self.assertEqual(self.sync(0, [(self.lamp, 1)]).status_code, 409)
+        self.assertEqual(self.sync(1, [(self.lamp, 1)]).status_code, 200)
+        self.assertEqual(self.items(), {self.lamp.pk: 1})
+
+
+class CartBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.lamp = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+        cls.desk = Products.objects.create(product_name='Desk', description='d', price='40.00', stock=1, seller=cls.seller)
+
+    def setUp(self):
+        self.cart = Carts.objects.get_active(self.buyer.pk)
+        CartItems.objects.create(cart=self.cart, product=self.lamp, quantity=1)
+
+    def batch(self, *operations):
+        return self.client.post(
+            reverse('carts-batch', args=[self.cart.pk]), {'operations': list(operations)}, content_type='application/json'
+        )
+
+    def assert_unchanged(self):
+        self.assertEqual(dict(self.cart.cartitems_set.values_list('product_id', 'quantity')), {self.lamp.pk: 1})
+        self.assertEqual(list(Products.objects.order_by('id').values_list('reserved', flat=True)), [0, 0])
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.version, 0)
+
+    def test_operations_apply_in_order(self):
+        response = self.batch(
+            {'op': 'add', 'product': self.lamp.pk, 'quantity': 2},
+            {'op': 'set', 'product': self.desk.pk, 'quantity': 1},
+            {'op': 'remove', 'product': self.lamp.pk},
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([(item['product'], item['quantity']) for item in response.json()['items']], [(self.desk.pk, 1)])
+        self.assertEqual(response.json()['version'], 1)
+
+    def test_batch_short_of_stock_applies_nothing(self):
+        response = self.batch(
+            {'op': 'add', 'product': self.lamp.pk, 'quantity': 2},
+            {'op': 'set', 'product': self.desk.pk, 'quantity': 2},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([row['id'] for row in response.json()['insufficient_stock']], [self.desk.pk])
+        self.assert_unchanged()
+
+    def test_batch_with_a_missing_product_applies_nothing(self):
+        response = self.batch(
+            {'op': 'add', 'product': self.lamp.pk},
+            {'op': 'add', 'product': 0},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['missing_products'], [0])
+        self.assert_unchanged()
+
+
+class JobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        load_handlers()
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.product = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+
+    def check_out(self):
+        cart = Carts.objects.get_active(self.buyer.pk)
+        CartItems.objects.create(cart=cart, product=self.product, quantity=3)
+        response = self.client.post(reverse('checkouts-list'), {'cart': cart.pk}, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return cart, response.json()['id']
+
+    def run_due(self, now=None):
+        return [run_job(job) for job in claim(10, now=now)]
+
+    def sales(self):
+        return list(SellerDailySales.objects.values_list('units', 'orders'))
+
+    def test_checkout_is_readable_before_its_job_runs(self):
+        cart, checkout_id = self.check_out()
+        history = self.client.get(reverse('checkouts-history', kwargs={'user_id': self.buyer.pk})).json()
+        self.assertEqual([order['id'] for order in history['results']], [checkout_id])
+        self.assertFalse(CartItems.objects.filter(cart=cart).exists())
+        self.assertTrue(Carts.objects.filter(user=self.buyer, status='open').exists())
+        self.assertEqual(self.sales(), [])
+
+        self.assertEqual(self.run_due(), ['done'])
+        self.assertEqual(self.sales(), [(3, 1)])
+        self.assertFalse(Jobs.objects.exists())
+
+    def test_replayed_job_adds_nothing(self):
+        _, checkout_id = self.check_out()
+        self.run_due()
+        enqueue('checkouts.completed', {'checkout_id': checkout_id})
+        self.assertEqual(self.run_due(), ['done'])
+        self.assertEqual(self.sales(), [(3, 1)])
+
+    def test_job_after_rebuild_adds_nothing(self):
+        self.check_out()
+        rebuild_rollups()
+        self.assertEqual(self.run_due(), ['done'])
+        self.assertEqual(self.sales(), [(3, 1)])
+
+    def test_failed_rebuild_keeps_the_old_totals(self):
+        self.check_out()
+        self.run_due()
+        self.check_out()
+        with mock.patch('products.rollups.apply_increments', side_effect=[None, DatabaseError('disk full')]):
+            with self.assertRaises(DatabaseError):
+                rebuild_rollups()
+        self.assertEqual(self.sales(), [(3, 1)])
+        # The second order is still counted by its job
+        self.assertEqual(self.run_due(), ['done'])
+        self.assertEqual(self.sales(), [(6, 2)])
+
+    def test_failing_job_backs_off_then_fails(self):
+        failing = mock.Mock(side_effect=RuntimeError('boom'))
+        with mock.patch.dict(HANDLERS, {'tests.failing': failing}), self.settings(JOB_MAX_ATTEMPTS=3):
+            job = enqueue('tests.failing', {'value': 1})
+            later = timezone.now()
+            for attempt in (1, 2):
+                later += timedelta(hours=2)
+                self.assertEqual(self.run_due(now=later), ['retry'])
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.attempts), ('queued', attempt))
+                delay = (job.run_after - timezone.now()).total_seconds()
+                expected = settings.JOB_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                self.assertTrue(expected - 1 <= delay <= expected * 1.1 + 1, delay)
+                self.assertIn('RuntimeError: boom', job.last_error)
+                # Not due again until the backoff has passed
+                self.assertEqual(claim(10), [])
+
+            self.assertEqual(self.run_due(now=later + timedelta(hours=2)), ['failed'])
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'failed')
+            self.assertEqual(self.run_due(now=later + timedelta(days=1)), [])
+        failing.assert_called_with(value=1)
+        self.assertEqual(failing.call_count, 3)
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue('tests.noop')
+        with mock.patch.dict(HANDLERS, {'tests.noop': lambda: None}):
+            [first] = claim(10)
+            self.assertEqual(claim(10), [])
+            expired = timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS + 1)
+            [second] = claim(10, now=expired)
+            self.assertEqual((second.pk, second.attempts), (first.pk, 2))
+
+            # The first run's outcome is no longer its to record
+            self.assertEqual(run_job(first), 'done')
+            self.assertTrue(Jobs.objects.filter(pk=first.pk).exists())
+            self.assertEqual(run_job(second), 'done')
+            self.assertFalse(Jobs.objects.exists())
+
+    def test_worker_survives_a_failed_outcome(self):
+        enqueue('tests.noop')
+        with mock.patch('products.management.commands.run_jobs.run_job', side_effect=RuntimeError('locked')):
+            call_command('run_jobs', burst=True, workers=1, stdout=mock.MagicMock())
+        self.assertEqual(Jobs.objects.get().status, 'running')
+
+
+class OrderSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.lamp = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+        cls.desk = Products.objects.create(product_name='Desk', description='d', price='40.00', stock=10, seller=cls.seller)
+
+    def setUp(self):
+        cart = Carts.objects.get_active(self.buyer.pk)
+        CartItems.objects.create(cart=cart, product=self.lamp, quantity=2)
+        response = self.client.post(reverse('checkouts-list'), {'cart': cart.pk}, content_type='application/json')
+        self.checkout_id = response.json()['id']
+        self.item_id = response.json()['items'][0]['id']
+        # The order keeps the price paid
+        Products.objects.filter(pk=self.lamp.pk).update(price='3.00')
+
+    def write(self, method, url, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, content_type='application/json')
+        self.assertLess(response.status_code, 300, response.content)
+
+    def detail(self):
+        return self.client.get(reverse('checkouts-detail', args=[self.checkout_id])).json()
+
+    def test_checkout_update_rewrites_summary(self):
+        self.write('patch', reverse('checkouts-detail', args=[self.checkout_id]), {'total_amount': '4.00'})
+        self.assertEqual(self.detail()['total_amount'], '4.00')
+
+    def test_item_writes_rewrite_summary(self):
+        item_url = reverse('checkout-items-detail', args=[self.item_id])
+        self.write('patch', item_url, {'quantity': 5})
+        self.write('post', reverse('checkout-items-list'), {'checkout': self.checkout_id, 'product': self.desk.pk, 'quantity': 1})
+        items = self.detail()['items']
+        self.assertEqual(
+            [(item['product_name'], item['product_price'], item['quantity']) for item in items],
+            [('Lamp', '2.50', 5), ('Desk', '40.00', 1)],
+        )
+
+        self.write('delete', item_url)
+        history = self.client.get(reverse('checkouts-history', kwargs={'user_id': self.buyer.pk})).json()
+        self.assertEqual(history['results'][0]['total_items'], 1)
+
+    def test_checkout_delete_removes_summary(self):
+        self.write('delete', reverse('checkouts-detail', args=[self.checkout_id]))
+        self.assertFalse(OrderSummaries.objects.exists())
+
+
+class SellerReportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.other = User.objects.create_user(email='other@example.com', username='other', password=None, role='seller')
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password=None, is_staff=True)
+
+    def get(self, route, user=None):
+        return self.client.get(reverse(route, args=[self.seller.pk]), **(auth(user) if user else {}))
+
+    def test_reports_are_for_the_seller_and_staff_only(self):
+        for route in ('sellers-analytics', 'sellers-dashboard'):
+            with self.subTest(route):
+                self.assertEqual(self.get(route).status_code, 401)
+                self.assertEqual(self.get(route, self.other).status_code, 403)
+                self.assertEqual(self.get(route, self.seller).status_code, 200)
+                self.assertEqual(self.get(route, self.staff).status_code, 200)
+
+
+class ExportTests(TestCase):
+    ROUTES = ['products-export', 'checkouts-export', 'checkout-items-export']
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password=None, is_staff=True)
+
+    def test_exports_are_for_staff_only(self):
+        for route in self.ROUTES:
+            with self.subTest(route):
+                self.assertEqual(self.client.get(reverse(route)).status_code, 401)
+                self.assertEqual(self.client.get(reverse(route), **auth(self.buyer)).status_code, 403)
+                response = self.client.get(reverse(route), **auth(self.staff))
+                self.assertEqual(response.status_code, 200)
+                b''.join(response.streaming_content)
+
+    def test_streamed_queries_are_measured(self):
+        registry.reset()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('checkout-items-export'), **auth(self.staff))
+            b''.join(response.streaming_content)
+        stats = registry.snapshot()[('checkout-items-export', 'GET')]
+        self.assertEqual((stats.count, stats.db_queries), (1, len(captured.captured_queries)))
+
+
+class ProductImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.other = User.objects.create_user(email='other@example.com', username='other', password=None, role='seller')
+        cls.staff = User.objects.create_user(email='staff@example.com', username='staff', password=None, is_staff=True)
+        Products.objects.create(product_name='Theirs', description='d', price=5, stock=5, seller=cls.other, sku='SKU-1')
+
+    def upload(self, user=None, **data):
+        csv = SimpleUploadedFile('products.csv', b'sku,product_name,description,price,stock\nSKU-1,Mine,d,1.00,999\n')
+        return self.client.post(reverse('products-import'), {'file': csv, **data}, **(auth(user) if user else {}))
+
+    def test_anonymous_import_is_rejected(self):
+        self.assertEqual(self.upload(seller=self.other.pk).status_code, 401)
+        self.assertEqual(Products.objects.get(sku='SKU-1').price, 5)
+
+    def test_seller_imports_into_own_catalog_only(self):
+        self.assertEqual(self.upload(self.seller, seller=self.other.pk).status_code, 403)
+        theirs = Products.objects.get(seller=self.other, sku='SKU-1')
+        self.assertEqual((theirs.product_name, theirs.stock), ('Theirs', 5))
+
+        response = self.upload(self.seller)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Products.objects.get(seller=self.seller, sku='SKU-1').stock, 999)
+
+    def test_staff_imports_for_any_seller(self):
+        response = self.upload(self.staff, seller=self.other.pk)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Products.objects.get(seller=self.other, sku='SKU-1').product_name, 'Mine')
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+@mock.patch('ecommerce.db_router.replica_is_healthy', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Outside a TestCase transaction, which would keep every read on the primary"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+
+    def request_through_middleware(self, request, view):
+        """Run `view(request)` inside PrimaryStickinessMiddleware and return the response"""
+        def get_response(request):
+            view(request)
+            return HttpResponse()
+        return PrimaryStickinessMiddleware(get_response)(request)
+
+    def test_reads_go_to_replicas_unless_pinned(self, healthy):
+        self.assertEqual(self.router.db_for_read(Products), 'replica1')
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Products), 'default')
+        healthy.return_value = False
+        self.assertEqual(self.router.db_for_read(Products), 'default')
+
+    def test_writes_stick_the_client_to_the_primary(self, healthy):
+        reads = []
+
+        def read(request):
+            reads.append(self.router.db_for_read(Products))
+
+        def write(request):
+            self.router.db_for_write(Products)
+            reads.append(self.router.db_for_read(Products))
+
+        factory = RequestFactory()
+        token = {'HTTP_AUTHORIZATION': 'Bearer token'}
+        self.request_through_middleware(factory.get('/', **token), read)
+        # An unsafe method is pinned before it writes
+        self.request_through_middleware(factory.post('/', **token), read)
+        response = self.request_through_middleware(factory.get('/', **token), write)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        # Sticky by cookie for browsers, and by Authorization header for API clients
+        factory.cookies[STICKY_COOKIE] = '1'
+        self.request_through_middleware(factory.get('/'), read)
+        self.request_through_middleware(RequestFactory().get('/', **token), read)
+        self.request_through_middleware(RequestFactory().get('/'), read)
+        self.assertEqual(reads, ['replica1', 'default', 'default', 'default', 'default', 'replica1'])
+
+    def test_catalog_misses_are_built_on_a_replica(self, healthy):
+        databases = []
+
+        def build():
+            databases.append(self.router.db_for_read(Products))
+            return Response([])
+
+        cached_catalog_response(RequestFactory().get('/api/products/'), build)
+        self.assertEqual(databases, ['replica1'])
+
+
+class CatalogCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = get_user_model().objects.create_user(
+            email='seller@example.com', username='seller', password=None, role='seller'
+        )
+        cls.product = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **headers):
+        return self.client.get(reverse('products-detail', args=[self.product.pk]), **headers)
+
+    def test_conditional_get_sees_every_change(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # In the same second as the first fetch, so Last-Modified is unchanged
+        Products.objects.filter(pk=self.product.pk).update(stock=9, updated_at=timezone.now())
+        bump_catalog_version()
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': first['ETag']},
+            {'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']},
+            {'HTTP_IF_NONE_MATCH': first['ETag'], 'HTTP_IF_MODIFIED_SINCE': first['Last-Modified']},
+        ):
+            with self.subTest(headers):
+                response = self.get(**headers)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['stock'], 9)
+
+
+class ProductFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.seller = User.objects.create_user(email='seller@example.com', username='seller', password=None, role='seller')
+        cls.buyer = User.objects.create_user(email='buyer@example.com', username='buyer', password=None)
+        cls.product = Products.objects.create(product_name='Lamp', description='d', price='2.50', stock=10, seller=cls.seller)
+
+    def setUp(self):
+        cache.clear()
+        caches[FRAGMENT_CACHE].clear()
+
+    def fetch(self):
+        return self.client.get(reverse('products-detail', args=[self.product.pk])).json()
+
+    def write(self, method, url, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(url, data, content_type='application/json')
+        self.assertLess(response.status_code, 300, response.content)
+
+    def test_saved_product_gets_a_new_fragment(self):
+        self.assertEqual(self.fetch()['price'], '2.50')
+        self.write('patch', reverse('products-detail', args=[self.product.pk]), {'price': '3.00'})
+        self.assertEqual(self.fetch()['price'], '3.00')
+
+    def test_checkout_stock_decrement_gets_a_new_fragment(self):
+        self.assertEqual(self.fetch()['stock'], 10)
+        cart = Carts.objects.get_active(self.buyer.pk)
+        CartItems.objects.create(cart=cart, product=self.product, quantity=3)
+        self.write('post', reverse('checkouts-list'), {'cart': cart.pk})
+        self.assertEqual(self.fetch()['stock'], 7)
+
+    def test_fragments_are_keyed_by_updated_at(self):
+        product = Products.objects.only(*FRAGMENT_FIELDS).get(pk=self.product.pk)
+        product_fragments([product])
+        # A bulk update that forgets updated_at keeps serving the old fragment
+        Products.objects.filter(pk=product.pk).update(stock=1)
+        self.assertEqual(json.loads(product_fragments([product])[0])['stock'], 10)
+        Products.objects.filter(pk=product.pk).update(stock=1, updated_at=timezone.now())
+        product = Products.objects.only(*FRAGMENT_FIELDS).get(pk=self.product.pk)
+        self.assertEqual(json.loads(product_fragments([product])[0])['stock'], 1)
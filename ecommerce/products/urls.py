@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductsViewSet, CartsViewSet, CartItemsViewSet, CheckoutsViewSet, CheckoutItemsViewSet
+from .views import ProductsViewSet, CartsViewSet, CartItemsViewSet, CheckoutsViewSet, CheckoutItemsViewSet, SellersViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'products', ProductsViewSet, basename='products')
@@ -8,7 +9,13 @@ router.register(r'carts', CartsViewSet, basename='carts')
 router.register(r'cart-items', CartItemsViewSet, basename='cart-items')
 router.register(r'checkouts', CheckoutsViewSet, basename='checkouts')
 router.register(r'checkout-items', CheckoutItemsViewSet, basename='checkout-items')
+router.register(r'sellers', SellersViewSet, basename='sellers')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Async read paths for ASGI deployments; same responses as the routes above
+    path('async/products/', async_views.product_list, name='async-products-list'),
+    path('async/products/<str:pk>/', async_views.product_detail, name='async-products-detail'),
+    path('async/carts/<str:user_id>/', async_views.active_cart, name='async-carts-detail'),
+    path('async/checkouts/user/<str:user_id>/', async_views.checkout_history, name='async-checkouts-history'),
 ]
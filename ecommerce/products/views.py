@@ -1,24 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from .models import Products, Carts, CartItems, Checkouts, CheckoutItems
+from rest_framework.permissions import AllowAny, IsAdminUser
+from .cache import bump_catalog_version, cached_catalog_response
+from .exports import FORMATS, streaming_export_response
+from .fieldsets import Fieldset, sparse_queryset
+from .fragments import FRAGMENT_FIELDS, PrerenderedJSONResponse, product_fragments, render_page, serves_fragments
+from .filters import ProductsFilter, ProductSearchFilter
+from .idempotency import idempotent
+from .jobs import enqueue
+from .imports import detect_format, import_products
+from .models import (
+    Products, Carts, CartItems, Checkouts, CheckoutItems, OrderSummaries, SellerDailySales,
+    SellerProductDailySales, StockReservations
+)
+from .pagination import CheckoutsCursorPagination, CreatedAtCursorPagination, ProductsPagination
+from .permissions import IsSellerAccount, IsSellerOrStaff
+from .reservations import InsufficientStock, release_cart, sync_reservations
 from .serializers import (
     ProductsSerializer,
+    CartBatchSerializer,
     CartSerializer,
+    CartSyncSerializer,
     CartItemSerializer,
     CheckoutSerializer,
-    CheckoutItemSerializer
+    CheckoutItemSerializer,
+    InventorySummarySerializer,
+    LowStockProductSerializer,
+    OrderSummarySerializer,
+    SalesPeriodSerializer,
+    SalesTotalsSerializer,
+    SellerAnalyticsQuerySerializer,
+    SellerDashboardQuerySerializer,
+    TopProductSerializer
 )
 
 
+def insufficient_stock_response(shortages):
+    return Response(
+        {
+            'error': 'Insufficient stock for some items in the cart.',
+            'insufficient_stock': list(shortages),
+        },
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def inactive_cart_response():
+    return Response(
+        {'error': 'This cart is no longer active. Please use a fresh cart.'},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+def export_response(request, table, queryset=None):
+    """Stream `table` as `?type=csv` (default) or `?type=ndjson`"""
+    export_format = request.query_params.get('type', 'csv')
+    if export_format not in FORMATS:
+        return Response(
+            {'error': f"Unsupported export type '{export_format}'. Use one of: {', '.join(FORMATS)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return streaming_export_response(table, export_format, queryset)
+
+
+def carts_for_read(request):
+    """Carts with their items and totals, or just the parts `?fields=`/`?exclude=` ask for"""
+    fieldset = Fieldset.from_request(request)
+    if fieldset is None:
+        return Carts.objects.with_items()
+    carts = sparse_queryset(Carts.objects.all(), CartSerializer, fieldset, extra=['created_at'])
+    if fieldset.keeps('', 'total_items'):
+        carts = carts.with_items_count()
+    if fieldset.keeps('', 'cart_total'):
+        carts = carts.with_items_total()
+    return carts
+
+
+def checkouts_for_read(request):
+    """Checkouts with their items and item count, or just the parts `?fields=`/`?exclude=` ask for"""
+    fieldset = Fieldset.from_request(request)
+    if fieldset is None:
+        return Checkouts.objects.with_items()
+    checkouts = sparse_queryset(Checkouts.objects.all(), CheckoutSerializer, fieldset, extra=['checkout_date'])
+    if fieldset.keeps('', 'total_items'):
+        checkouts = checkouts.with_items_count()
+    return checkouts
+
+
+def summaries_for_read(request, summaries):
+    fieldset = Fieldset.from_request(request)
+    if fieldset is None:
+        return summaries
+    return sparse_queryset(summaries, OrderSummarySerializer, fieldset, extra=['checkout_date'])
+
+
 class ProductsViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing products.
+
+    Supports `?search=`, `?seller=`, `?min_price=`/`?max_price=`,
+    `?min_stock=`/`?max_stock=`, `?ordering=`, `?page=`/`?page_size=` and
+    `?fields=`/`?exclude=` (see fieldsets.py).
     """
-    queryset = Products.objects.all()
+    queryset = Products.objects.order_by('-created_at', '-id')
     serializer_class = ProductsSerializer
     permission_classes = [AllowAny]
+    pagination_class = ProductsPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
+    filterset_class = ProductsFilter
+    ordering_fields = ['product_name', 'price', 'stock', 'created_at']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fieldset = Fieldset.from_request(self.request)
+        if fieldset is not None and self.action in ('list', 'retrieve'):
+            return sparse_queryset(queryset, ProductsSerializer, fieldset)
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        build = self.list_fragments if serves_fragments(request) else super().list
+        return cached_catalog_response(request, lambda: build(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        build = self.retrieve_fragment if serves_fragments(request) else super().retrieve
+        return cached_catalog_response(request, lambda: build(request, *args, **kwargs))
+
+    def list_fragments(self, request, *args, **kwargs):
+        """The list page, joined from cached product fragments"""
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()).only(*FRAGMENT_FIELDS))
+        envelope = self.get_paginated_response(None).data
+        return PrerenderedJSONResponse(render_page(envelope, product_fragments(page)))
+
+    def retrieve_fragment(self, request, *args, **kwargs):
+        product = get_object_or_404(self.filter_queryset(self.get_queryset()).only(*FRAGMENT_FIELDS), pk=kwargs['pk'])
+        fragments = product_fragments([product])
+        if not fragments:
+            raise Http404
+        return PrerenderedJSONResponse(fragments[0])
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream every product matching the list filters as CSV or NDJSON; staff only"""
+        return export_response(request, 'products', self.filter_queryset(Products.objects.order_by('id')))
+
+    @action(
+        detail=False, methods=['post'], url_path='import', url_name='import',
+        parser_classes=[MultiPartParser], permission_classes=[IsSellerAccount],
+    )
+    def bulk_import(self, request):
+        """
+        Create or update the caller's products from a CSV or NDJSON `file`, matched on sku.
+
+        Staff may import into another seller's catalog by passing `seller`.
+        Valid rows are imported even when others fail; the response lists
+        the failures by row number.
+        """
+        upload = request.FILES.get('file')
+        seller_id = request.data.get('seller') or request.user.id
+        if upload is None:
+            return Response({'error': 'Upload a CSV or NDJSON file as `file`.'}, status=status.HTTP_400_BAD_REQUEST)
+        if str(seller_id) != str(request.user.id) and not request.user.is_staff:
+            return Response(
+                {'error': 'You can only import into your own catalog.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not str(seller_id).isdigit() or not get_user_model().objects.filter(pk=seller_id, role='seller').exists():
+            return Response(
+                {'error': f'Seller with ID {seller_id} does not exist.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        import_format = detect_format(upload.name, request.data.get('type'))
+        if import_format is None:
+            return Response(
+                {'error': 'Unsupported file type. Use .csv or .ndjson, or pass `type`.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        report = import_products(upload, int(seller_id), import_format)
+        return Response(report.as_dict())
 
 
 class CartsViewSet(viewsets.ModelViewSet):
@@ -28,19 +197,20 @@ class CartsViewSet(viewsets.ModelViewSet):
     queryset = Carts.objects.all()
     serializer_class = CartSerializer
     permission_classes = [AllowAny]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return carts_for_read(self.request)
+        return super().get_queryset()
     
     def retrieve(self, request, pk=None):
         """Override retrieve to search by user_id instead of cart id"""
         try:
-            carts = Carts.objects.filter(user_id=pk).order_by('-created_at')
-            cart = None
-            for existing_cart in carts:
-                if not Checkouts.objects.filter(cart=existing_cart).exists():
-                    cart = existing_cart
-                    break
-
+            carts = self.get_queryset()
+            cart = carts.filter(user_id=pk, status='open').first()
             if not cart:
-                cart = Carts.objects.create(user_id=pk)
+                cart = carts.get(pk=Carts.objects.get_active(pk).pk)
 
             serializer = self.get_serializer(cart)
             return Response(serializer.data)
@@ -49,11 +219,23 @@ class CartsViewSet(viewsets.ModelViewSet):
                 {'error': str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-    
+
+    def update(self, request, *args, **kwargs):
+        """Update the cart, then return it with its items and totals loaded in one pass"""
+        partial = kwargs.pop('partial', False)
+        cart = self.get_object()
+        serializer = self.get_serializer(cart, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+
+        cart = Carts.objects.with_items().get(pk=cart.pk)
+        serializer = self.get_serializer(cart)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
+    @idempotent
     def add_item(self, request, pk=None):
         """Add item to cart"""
-        cart = self.get_object()
         product_id = request.data.get('product')
         quantity = request.data.get('quantity', 1)
         
@@ -63,38 +245,151 @@ class CartsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        cart_item, created = CartItems.objects.get_or_create(
-            cart=cart,
-            product_id=product_id,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            cart_item.quantity += int(quantity)
-            cart_item.save()
+        try:
+            with transaction.atomic():
+                cart = self.get_object()
+                if cart.status != 'open':
+                    return inactive_cart_response()
+                cart_item, created = CartItems.objects.get_or_create(
+                    cart=cart,
+                    product_id=product_id,
+                    defaults={'quantity': quantity}
+                )
+
+                if not created:
+                    cart_item.quantity += int(quantity)
+                    cart_item.save()
+
+                sync_reservations(cart, [cart_item.product_id])
+                cart.bump_version()
+        except InsufficientStock as e:
+            return insufficient_stock_response(e.shortages)
         
         serializer = CartItemSerializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def batch(self, request, pk=None):
+        """Apply a list of add / set / remove operations and return the updated cart"""
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        product_ids = {operation['product'] for operation in operations}
+        found = set(Products.objects.filter(id__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - found)
+        if missing:
+            return Response(
+                {'error': 'Some products do not exist.', 'missing_products': missing},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                cart = self.get_object()
+                if cart.status != 'open':
+                    return inactive_cart_response()
+                cart.apply_operations(operations)
+                sync_reservations(cart, product_ids)
+                cart.bump_version()
+        except InsufficientStock as e:
+            return insufficient_stock_response(e.shortages)
+
+        cart = Carts.objects.with_items().get(pk=cart.pk)
+        serializer = self.get_serializer(cart)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=['post'])
+    @idempotent
+    def sync(self, request, pk=None):
+        """
+        Bring the cart to the full item state the client sends, given the `version` it last saw.
+
+        Only the differences are written. Returns the updated cart with its
+        new version, `{"unchanged": true, "version": ...}` when nothing
+        differs, or 409 with the current cart when the version is stale.
+        """
+        serializer = CartSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        version = serializer.validated_data['version']
+        wanted = {item['product']: item['quantity'] for item in serializer.validated_data['items']}
+
+        try:
+            with transaction.atomic():
+                cart = get_object_or_404(Carts.objects.select_for_update(), pk=pk)
+                if cart.status != 'open':
+                    return inactive_cart_response()
+                if cart.version != version:
+                    current = Carts.objects.with_items().get(pk=cart.pk)
+                    return Response(
+                        {
+                            'error': f'The cart has changed since version {version}.',
+                            'cart': self.get_serializer(current).data,
+                        },
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+                current = dict(cart.cartitems_set.values_list('product_id', 'quantity'))
+                operations = [
+                    {'op': 'set', 'product': product_id, 'quantity': quantity}
+                    for product_id, quantity in wanted.items()
+                    if current.get(product_id, 0) != quantity
+                ] + [{'op': 'remove', 'product': product_id} for product_id in current.keys() - wanted.keys()]
+                if not operations:
+                    return Response({'unchanged': True, 'version': cart.version})
+
+                added = {operation['product'] for operation in operations if operation['product'] not in current}
+                missing = sorted(added - set(Products.objects.filter(id__in=added).values_list('id', flat=True)))
+                if missing:
+                    return Response(
+                        {'error': 'Some products do not exist.', 'missing_products': missing},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                cart.apply_operations(operations)
+                sync_reservations(cart, {operation['product'] for operation in operations})
+                cart.bump_version()
+        except InsufficientStock as e:
+            return insufficient_stock_response(e.shortages)
+
+        cart = Carts.objects.with_items().get(pk=cart.pk)
+        return Response(self.get_serializer(cart).data)
+
     @action(detail=True, methods=['delete'])
     def clear(self, request, pk=None):
         """Clear all items from cart"""
         cart = self.get_object()
-        cart.cartitems_set.all().delete()
+        with transaction.atomic():
+            cart.cartitems_set.all().delete()
+            release_cart(cart)
+            cart.bump_version()
         return Response(
             {'message': 'Cart cleared successfully'},
             status=status.HTTP_204_NO_CONTENT
         )
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            release_cart(instance)
+            instance.delete()
+
 
 class CartItemsViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing cart items.
     """
-    queryset = CartItems.objects.all()
+    queryset = CartItems.objects.select_related('product')
     serializer_class = CartItemSerializer
     permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        fieldset = Fieldset.from_request(self.request)
+        if fieldset is not None and self.action in ('list', 'retrieve'):
+            return sparse_queryset(CartItems.objects.all(), CartItemSerializer, fieldset)
+        return super().get_queryset()
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Add item to cart, create cart if not exists"""
         # Get user_id from request data, or try to get from authenticated user
@@ -138,35 +433,67 @@ class CartItemsViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get or create the latest cart without checkout for this user
-        carts = Carts.objects.filter(user_id=user_id).order_by('-created_at')
-        cart = None
-        for existing_cart in carts:
-            if not Checkouts.objects.filter(cart=existing_cart).exists():
-                cart = existing_cart
-                break
-
-        if not cart:
-            cart = Carts.objects.create(user_id=user_id)
-            created = True
-        else:
-            created = False
-        
-        # Get or create cart item
-        cart_item, item_created = CartItems.objects.get_or_create(
-            cart=cart,
-            product_id=product_id,
-            defaults={'quantity': quantity}
-        )
-        
-        # If item already exists, update quantity
-        if not item_created:
-            cart_item.quantity += int(quantity)
-            cart_item.save()
+        try:
+            with transaction.atomic():
+                # Get or create the user's open cart
+                cart = Carts.objects.get_active(user_id)
+
+                # Get or create cart item
+                cart_item, item_created = CartItems.objects.get_or_create(
+                    cart=cart,
+                    product_id=product_id,
+                    defaults={'quantity': quantity}
+                )
+
+                # If item already exists, update quantity
+                if not item_created:
+                    cart_item.quantity += int(quantity)
+                    cart_item.save()
+
+                # Hold the stock until checkout or expiry
+                sync_reservations(cart, [cart_item.product_id])
+                cart.bump_version()
+        except InsufficientStock as e:
+            return insufficient_stock_response(e.shortages)
         
         serializer = self.get_serializer(cart_item)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        try:
+            with transaction.atomic():
+                cart_item = self.get_object()
+                if cart_item.cart.status != 'open':
+                    return inactive_cart_response()
+                serializer = self.get_serializer(cart_item, data=request.data, partial=partial)
+                serializer.is_valid(raise_exception=True)
+                self.perform_update(serializer)
+        except InsufficientStock as e:
+            return insufficient_stock_response(e.shortages)
+        return Response(serializer.data)
+
+    @idempotent
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            cart_item = self.get_object()
+            if cart_item.cart.status != 'open':
+                return inactive_cart_response()
+            self.perform_destroy(cart_item)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_update(self, serializer):
+        previous_product_id = serializer.instance.product_id
+        cart_item = serializer.save()
+        sync_reservations(cart_item.cart, {previous_product_id, cart_item.product_id})
+        cart_item.cart.bump_version()
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        sync_reservations(instance.cart, [instance.product_id])
+        instance.cart.bump_version()
+
 
 class CheckoutsViewSet(viewsets.ModelViewSet):
     """
@@ -175,9 +502,29 @@ class CheckoutsViewSet(viewsets.ModelViewSet):
     queryset = Checkouts.objects.all()
     serializer_class = CheckoutSerializer
     permission_classes = [AllowAny]
+    pagination_class = CheckoutsCursorPagination
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return checkouts_for_read(self.request)
+        return super().get_queryset()
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serve order detail from its summary, falling back to the joined read"""
+        try:
+            summary = summaries_for_read(request, OrderSummaries.objects.all()).get(checkout_id=kwargs['pk'])
+        except (OrderSummaries.DoesNotExist, ValueError):
+            return super().retrieve(request, *args, **kwargs)
+        return Response(OrderSummarySerializer(summary, context=self.get_serializer_context()).data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream every checkout as CSV or NDJSON; staff only"""
+        return export_response(request, 'checkouts')
     
+    @idempotent
     def create(self, request, *args, **kwargs):
-        """Override create to auto-calculate total and copy cart items"""
+        """Check out a cart atomically: decrement stock, copy items, close the cart and queue the rollup"""
         cart_id = request.data.get('cart')
         
         if not cart_id:
@@ -185,71 +532,270 @@ class CheckoutsViewSet(viewsets.ModelViewSet):
                 {'error': 'Cart ID is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
+
         try:
-            cart = Carts.objects.get(id=cart_id)
-        except Carts.DoesNotExist:
-            return Response(
-                {'error': 'Cart not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
+            with transaction.atomic():
+                try:
+                    cart = Carts.objects.select_for_update().select_related('user').get(id=cart_id)
+                except Carts.DoesNotExist:
+                    return Response(
+                        {'error': 'Cart not found'}, 
+                        status=status.HTTP_404_NOT_FOUND
+                    )
 
-        if Checkouts.objects.filter(cart=cart).exists():
-            return Response(
-                {'error': 'This cart has already been checked out. Please use a fresh cart.'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Calculate total amount automatically
-        total_amount = sum(
-            item.product.price * item.quantity 
-            for item in cart.cartitems_set.all()
-        )
-        
-        # Create checkout
-        checkout = Checkouts.objects.create(
-            cart=cart,
-            total_amount=total_amount
-        )
-        
-        # Copy cart items to checkout items
-        for cart_item in cart.cartitems_set.all():
-            CheckoutItems.objects.create(
-                checkout=checkout,
-                product=cart_item.product,
-                quantity=cart_item.quantity
-            )
+                if cart.status == 'checked_out':
+                    return Response(
+                        {'error': 'This cart has already been checked out. Please use a fresh cart.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
 
-        # Clear cart items after checkout
-        cart.cartitems_set.all().delete()
+                if cart.status != 'open':
+                    return inactive_cart_response()
 
-        # Ensure user has a fresh cart available for next purchase
-        Carts.objects.create(user=cart.user)
-        
+                cart_items = CartItems.objects.filter(cart=cart)
+
+                # Calculate total amount automatically
+                summary = cart_items.aggregate(
+                    line_count=Count('id'),
+                    total_amount=Coalesce(
+                        Sum(F('quantity') * F('product__price')),
+                        Value(0),
+                        output_field=DecimalField(max_digits=10, decimal_places=2),
+                    ),
+                )
+                if not summary['line_count']:
+                    return Response(
+                        {'error': 'Cart is empty. Add items before checkout.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                # Turn the cart's holds into sales and decrement stock for every line
+                # in one statement, skipping products whose unreserved stock plus
+                # this cart's hold can't cover the ordered quantity
+                ordered = cart_items.filter(product=OuterRef('pk')).values('quantity')[:1]
+                held = Coalesce(Subquery(cart.reservations.filter(product=OuterRef('pk')).values('quantity')[:1]), 0)
+                in_cart = Products.objects.filter(cartitems__cart=cart)
+                decremented = in_cart.filter(stock__gte=F('reserved') - held + Subquery(ordered)).update(
+                    stock=F('stock') - Subquery(ordered),
+                    reserved=F('reserved') - held,
+                    # Stock is part of the cached product JSON
+                    updated_at=timezone.now(),
+                )
+                if decremented != summary['line_count']:
+                    raise InsufficientStock()
+                cart.reservations.all().delete()
+
+                # Create checkout
+                checkout = Checkouts.objects.create(
+                    cart=cart,
+                    total_amount=summary['total_amount']
+                )
+
+                # Copy cart items to checkout items
+                lines = list(cart_items.order_by('id').values_list(
+                    'product_id', 'quantity', 'product__product_name', 'product__price'
+                ))
+                checkout_items = CheckoutItems.objects.bulk_create([
+                    CheckoutItems(checkout=checkout, product_id=product_id, quantity=quantity)
+                    for product_id, quantity, _, _ in lines
+                ])
+
+                # Snapshot the order for history reads
+                OrderSummaries.objects.create(
+                    checkout=checkout,
+                    user_id=cart.user_id,
+                    username=cart.user.username,
+                    cart_id=cart.id,
+                    checkout_date=checkout.checkout_date,
+                    total_amount=checkout.total_amount,
+                    item_count=len(lines),
+                    lines=[
+                        [item.id, product_id, product_name, str(price), quantity]
+                        for item, (product_id, quantity, product_name, price) in zip(checkout_items, lines)
+                    ],
+                )
+
+                # Clear cart items after checkout
+                cart_items.delete()
+                cart.status = 'checked_out'
+                cart.version += 1
+                cart.save(update_fields=['status', 'version'])
+
+                # Ensure user has a fresh cart available for next purchase
+                Carts.objects.get_active(cart.user_id)
+
+                # Seller rollups are updated in the background; the job commits with the order
+                enqueue('checkouts.completed', {'checkout_id': checkout.pk})
+
+                # The stock update bypasses Products signals
+                transaction.on_commit(bump_catalog_version)
+        except InsufficientStock:
+            # Report against the rolled back stock levels; `available` includes this cart's holds
+            held = Coalesce(
+                Subquery(StockReservations.objects.filter(cart_id=cart_id, product=OuterRef('pk')).values('quantity')[:1]),
+                0,
+            )
+            short = Products.objects.filter(cartitems__cart_id=cart_id).annotate(
+                available=F('stock') - F('reserved') + held
+            ).filter(
+                available__lt=Subquery(
+                    CartItems.objects.filter(cart_id=cart_id, product=OuterRef('pk')).values('quantity')[:1]
+                )
+            ).values('id', 'product_name', 'stock', 'available')
+            return insufficient_stock_response(short)
+
+        checkout = Checkouts.objects.with_items().get(pk=checkout.pk)
         serializer = self.get_serializer(checkout)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @idempotent
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @idempotent
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'], url_path='user/(?P<user_id>[^/.]+)')
     def history(self, request, user_id=None):
-        """Return all checkouts for a specific user"""
+        """Return a user's checkouts, newest first, a cursor page at a time"""
         if not user_id:
             return Response(
                 {'error': 'User ID is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        checkouts = self.queryset.filter(
-            cart__user_id=user_id
-        ).order_by('-checkout_date')
+        summaries = summaries_for_read(request, OrderSummaries.objects.filter(user_id=user_id))
 
-        serializer = self.get_serializer(checkouts, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(summaries)
+        serializer = OrderSummarySerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
 class CheckoutItemsViewSet(viewsets.ModelViewSet):
     """
     API endpoint for managing checkout items.
     """
-    queryset = CheckoutItems.objects.all()
+    queryset = CheckoutItems.objects.select_related('product')
     serializer_class = CheckoutItemSerializer
-    permission_classes = [AllowAny]
\ No newline at end of file
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        fieldset = Fieldset.from_request(self.request)
+        if fieldset is not None and self.action in ('list', 'retrieve'):
+            return sparse_queryset(CheckoutItems.objects.all(), CheckoutItemSerializer, fieldset)
+        return super().get_queryset()
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """Stream every checkout item as CSV or NDJSON; staff only"""
+        return export_response(request, 'checkout-items')
+
+
+class SellersViewSet(viewsets.ViewSet):
+    """
+    Seller reporting, read from the precomputed sales rollups. Each seller
+    sees only their own reports; staff see every seller's.
+    """
+    permission_classes = [IsSellerOrStaff]
+
+    PERIODS = {
+        'day': F('date'),
+        'week': TruncWeek('date'),
+        'month': TruncMonth('date'),
+    }
+
+    # Low-stock products listed by the dashboard; the summary counts all of them
+    LOW_STOCK_LIMIT = 50
+
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        """
+        Inventory totals, low-stock products and a page of products for one seller.
+
+        Takes `?low_stock=` (default SELLER_LOW_STOCK_THRESHOLD) and
+        `?page=`/`?page_size=` for the product list, newest first.
+        """
+        seller = get_user_model().objects.filter(pk=pk, role='seller').first() if str(pk).isdigit() else None
+        if seller is None:
+            return Response(
+                {'error': f'Seller with ID {pk} does not exist.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        params = SellerDashboardQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        threshold = params.validated_data['low_stock']
+
+        # Each of these is one aggregate over the seller's index range
+        products = seller.products.all()
+        summary = products.aggregate(
+            products=Count('id'),
+            total_stock=Coalesce(Sum('stock'), 0),
+            inventory_value=Coalesce(
+                Sum(F('price') * F('stock')),
+                Value(0),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            low_stock=Count('id', filter=Q(stock__lt=threshold)),
+        )
+        summary.update(SellerDailySales.objects.filter(seller=seller).aggregate(
+            units_sold=Coalesce(Sum('units'), 0),
+            revenue=Coalesce(Sum('revenue'), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+        ))
+        low_stock = products.filter(stock__lt=threshold).order_by('stock', 'id')[:self.LOW_STOCK_LIMIT]
+
+        paginator = ProductsPagination()
+        page = paginator.paginate_queryset(products.order_by('-created_at', '-id'), request, view=self)
+
+        return Response({
+            'seller': seller.pk,
+            'low_stock_threshold': threshold,
+            'summary': InventorySummarySerializer(summary).data,
+            'low_stock': LowStockProductSerializer(low_stock, many=True).data,
+            'products': paginator.get_paginated_response(ProductsSerializer(page, many=True).data).data,
+        })
+
+    @action(detail=True, methods=['get'])
+    def analytics(self, request, pk=None):
+        """
+        Sales totals, revenue over time and top products for one seller.
+
+        Takes `?start=`/`?end=` (ISO dates, default the last 30 days),
+        `?interval=day|week|month` and `?top=` (default 10).
+        """
+        if not str(pk).isdigit() or not get_user_model().objects.filter(pk=pk, role='seller').exists():
+            return Response(
+                {'error': f'Seller with ID {pk} does not exist.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        params = SellerAnalyticsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        start, end = params.validated_data['start'], params.validated_data['end']
+        interval = params.validated_data['interval']
+
+        sums = {
+            'units': Coalesce(Sum('units'), 0),
+            'revenue': Coalesce(Sum('revenue'), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            'orders': Coalesce(Sum('orders'), 0),
+        }
+        days = SellerDailySales.objects.filter(seller_id=pk, date__range=(start, end))
+        totals = days.aggregate(**sums)
+        over_time = days.annotate(period=self.PERIODS[interval]).values('period').annotate(**sums).order_by('period')
+        top_products = (
+            SellerProductDailySales.objects.filter(seller_id=pk, date__range=(start, end))
+            .values('product', 'product__product_name')
+            .annotate(**sums)
+            .order_by('-revenue', 'product')[:params.validated_data['top']]
+        )
+
+        return Response({
+            'seller': int(pk),
+            'start': start,
+            'end': end,
+            'interval': interval,
+            'totals': SalesTotalsSerializer(totals).data,
+            'revenue_over_time': SalesPeriodSerializer(over_time, many=True).data,
+            'top_products': TopProductSerializer(top_products, many=True).data,
+        })
@@ -0,0 +1,99 @@
+"""
+Stateless JWT authentication.
+
+ClaimsJWTAuthentication trusts the verified claims that
+CustomTokenObtainPairSerializer puts in the access token and returns a
+ClaimsUser built from them, instead of loading CustomUser on every request.
+Revocation still works: each token carries the user's token_version, which is
+compared with the current one (cached for USER_CACHE_TIMEOUT seconds).
+Bumping it with revoke_tokens() invalidates every token issued before. Both
+lookups read the primary, never a replica.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+User = get_user_model()
+
+
+def _state_key(user_id):
+    return f'auth:token-state:{user_id}'
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_token_state(user_id):
+    """Return (token_version, is_active) for the user, or None if there is no such user"""
+    key = _state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        # A lagging replica could hand back the version from before a revocation
+        # and keep revoked tokens valid for as long as it stays cached
+        row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).values_list('token_version', 'is_active').first()
+        # Cache misses too, so a deleted user's tokens don't query on every request
+        state = tuple(row) if row else ()
+        cache.set(key, state, settings.USER_CACHE_TIMEOUT)
+    return state or None
+
+
+def check_token(token):
+    """Reject tokens of missing or inactive users and tokens issued before the last revocation"""
+    state = get_token_state(token[api_settings.USER_ID_CLAIM])
+    if state is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    token_version, is_active = state
+    if not is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    if token.get('token_version', 0) != token_version:
+        raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+
+def get_cached_user(user_id):
+    """The full CustomUser, cached for USER_CACHE_TIMEOUT seconds"""
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_user(user_id):
+    cache.delete_many([_state_key(user_id), _user_key(user_id)])
+
+
+def revoke_tokens(user_id):
+    """Invalidate every access and refresh token issued to the user so far"""
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    forget_user(user_id)
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user backed by token claims.
+
+    Profile claims (email, role, first_name, ...) read straight from the
+    token; use `instance` where the full model is needed.
+    """
+
+    @cached_property
+    def instance(self):
+        return get_cached_user(self.id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken('Token contained no recognizable user identification')
+        check_token(validated_token)
+        return ClaimsUser(validated_token)
@@ -12,6 +12,8 @@ class CustomUser(AbstractUser):
     last_name = models.CharField(max_length=30)
     phone_number = models.CharField(max_length=30)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='customer')
+    # Embedded in issued tokens; bumping it revokes all of them
+    token_version = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'phone_number']
@@ -1,9 +1,10 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from rest_framework.exceptions import PermissionDenied
 import re
 import users.models as user_models
+from .authentication import check_token
 
 User = get_user_model()
 
@@ -59,6 +60,10 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['last_name'] = user.last_name
         token['phone_number'] = user.phone_number
         token['role'] = user.role
+        # Lets ClaimsJWTAuthentication authorize and revoke without loading the user
+        token['is_staff'] = user.is_staff
+        token['is_superuser'] = user.is_superuser
+        token['token_version'] = user.token_version
         return token
     
     def validate(self, attrs):
@@ -79,4 +84,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
             "role": self.user.role,
         })
 
-        return data
\ No newline at end of file
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Revoked refresh tokens must not mint new access tokens
+        check_token(self.token_class(attrs['refresh']))
+        return super().validate(attrs)
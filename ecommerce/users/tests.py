@@ -1,3 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from .authentication import get_token_state, revoke_tokens
+from .serializers import CustomTokenObtainPairSerializer
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(email='buyer@example.com', username='buyer', password=None)
+
+    def setUp(self):
+        cache.clear()
+        self.refresh = CustomTokenObtainPairSerializer.get_token(self.user)
+
+    def logout_all(self):
+        return self.client.post(reverse('logout_all'), HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+
+    def test_tokens_issued_before_logout_all_are_rejected(self):
+        self.assertEqual(self.logout_all().status_code, 200)
+        response = self.logout_all()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_revoked')
+
+    def test_revoked_refresh_token_mints_no_access_token(self):
+        self.assertEqual(
+            self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)}).status_code, 200
+        )
+        revoke_tokens(self.user.pk)
+        response = self.client.post(reverse('token_refresh'), {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_revocation_invalidates_the_cached_state(self):
+        self.assertEqual(get_token_state(self.user.pk), (0, True))
+        # Later requests read the state from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(get_token_state(self.user.pk), (0, True))
+
+        revoke_tokens(self.user.pk)
+        self.assertEqual(get_token_state(self.user.pk), (1, True))
+        self.assertEqual(self.logout_all().status_code, 401)
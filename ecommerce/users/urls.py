@@ -9,11 +9,11 @@
 #     path('', include(router.urls)),
 # ]
 from django.urls import path
-from .views import UsersViewSet, CustomTokenObtainPairView
-from rest_framework_simplejwt.views import TokenRefreshView
+from .views import UsersViewSet, CustomTokenObtainPairView, CustomTokenRefreshView, LogoutAllView
 
 urlpatterns = [
     path('register/', UsersViewSet.as_view({'post': 'create'}), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'),
+    path('logout-all/', LogoutAllView.as_view(), name='logout_all'),
 ]
\ No newline at end of file
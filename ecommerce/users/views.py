@@ -1,10 +1,12 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
 from django.contrib.auth import get_user_model
-from .serializers import CustomTokenObtainPairSerializer, RegisterSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
+from .authentication import revoke_tokens
+from .serializers import CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, RegisterSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from products.models import Carts
 from products.serializers import CartSerializer
 
@@ -22,9 +24,22 @@ class UsersViewSet(viewsets.ModelViewSet):
     def cart(self, request, pk=None):
         """Get or create user's cart"""
         user = self.get_object()
-        cart, created = Carts.objects.get_or_create(user=user)
-        serializer = CartSerializer(cart)
+        cart = Carts.objects.get_active(user.id)
+        serializer = CartSerializer(Carts.objects.with_items().get(pk=cart.pk))
         return Response(serializer.data)
     
 class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
\ No newline at end of file
+    serializer_class = CustomTokenObtainPairSerializer
+
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
+class LogoutAllView(APIView):
+    """Revoke every token issued to the current user"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        revoke_tokens(request.user.id)
+        return Response({'message': 'Logged out from all sessions'}, status=status.HTTP_200_OK)
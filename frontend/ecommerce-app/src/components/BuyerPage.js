@@ -3,15 +3,13 @@ import { getAllProducts } from "../services/products";
 import {
   getCart,
   addToCart,
-  updateCartItem,
-  removeFromCart,
+  syncCart,
   clearCart,
   checkoutCart,
   getCheckoutHistory,
 } from "../services/cart";
 
 function BuyerPage({ user, onLogout }) {
-  const [products, setProducts] = useState([]);
   const [filteredProducts, setFilteredProducts] = useState([]);
   const [searchQuery, setSearchQuery] = useState("");
   const [cartData, setCartData] = useState(null);
@@ -35,11 +33,10 @@ function BuyerPage({ user, onLogout }) {
     // eslint-disable-next-line
   }, []);
 
-  const loadProducts = async () => {
+  const loadProducts = async (query = "") => {
     try {
-      const data = await getAllProducts();
-      setProducts(data);
-      setFilteredProducts(data);
+      const data = await getAllProducts(query ? { search: query } : {});
+      setFilteredProducts(data.results || data);
       setLoading(false);
     } catch (error) {
       console.error("Failed to load products:", error);
@@ -58,16 +55,7 @@ function BuyerPage({ user, onLogout }) {
 
   const handleSearch = (query) => {
     setSearchQuery(query);
-    if (query) {
-      const filtered = products.filter(
-        (product) =>
-          product.product_name.toLowerCase().includes(query.toLowerCase()) ||
-          product.description.toLowerCase().includes(query.toLowerCase())
-      );
-      setFilteredProducts(filtered);
-    } else {
-      setFilteredProducts(products);
-    }
+    loadProducts(query.trim());
   };
 
   const handleAddToCart = async (productId) => {
@@ -88,20 +76,30 @@ function BuyerPage({ user, onLogout }) {
   };
 
   const handleUpdateItemQuantity = async (itemId, newQuantity) => {
+    if (!cartData?.id) return;
+    // The whole cart as it should be; a quantity of 0 removes the item
+    const items = cartData.items.map((item) => ({
+      product: item.product,
+      quantity: item.id === itemId ? Math.max(newQuantity, 0) : item.quantity,
+    }));
     try {
       setCartError("");
       setUpdatingItemId(itemId);
-      if (newQuantity <= 0) {
-        await removeFromCart(itemId);
-      } else {
-        await updateCartItem(itemId, newQuantity);
+      const result = await syncCart(cartData.id, cartData.version, items);
+      if (!result.unchanged) {
+        setCartData(result);
       }
-      await loadCart();
     } catch (error) {
       console.error("Failed to update cart item:", error);
-      setCartError(
-        error.response?.data?.error || "Failed to update item quantity."
-      );
+      if (error.response?.status === 409) {
+        // Changed in another tab or device: show the current cart
+        setCartData(error.response.data.cart);
+        setCartError("Your cart was updated elsewhere. Please try again.");
+      } else {
+        setCartError(
+          error.response?.data?.error || "Failed to update item quantity."
+        );
+      }
     } finally {
       setUpdatingItemId(null);
     }
@@ -152,7 +150,7 @@ function BuyerPage({ user, onLogout }) {
       setHistoryError("");
       setHistoryLoading(true);
       const history = await getCheckoutHistory(user.id);
-      setHistoryData(history);
+      setHistoryData(history.results || history);
     } catch (error) {
       console.error("Failed to load history:", error);
       setHistoryError(
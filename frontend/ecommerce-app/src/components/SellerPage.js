@@ -1,6 +1,6 @@
-import React, { useState, useEffect, useMemo } from "react";
+import React, { useState, useEffect } from "react";
 import {
-  getSellerProducts,
+  getSellerDashboard,
   createProduct,
   updateProduct,
   deleteProduct,
@@ -17,6 +17,7 @@ const formatCurrency = (value) => {
 
 function SellerPage({ user, onLogout }) {
   const [products, setProducts] = useState([]);
+  const [summary, setSummary] = useState(null);
   const [filteredProducts, setFilteredProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -78,18 +79,11 @@ function SellerPage({ user, onLogout }) {
       setLoading(true);
       setError(null);
       if (sellerId) {
-        const data = await getSellerProducts(sellerId);
-        const normalized = Array.isArray(data) ? data : data.results || [];
-        const ownedProducts = normalized.filter((product) => {
-          const sellerField = product.seller;
-          if (sellerField === undefined || sellerField === null) return false;
-          if (typeof sellerField === "object") {
-            return String(sellerField.id) === String(sellerId);
-          }
-          return String(sellerField) === String(sellerId);
-        });
-        setProducts(ownedProducts);
-        setFilteredProducts(ownedProducts);
+        // Totals are computed by the server over the whole catalog
+        const data = await getSellerDashboard(sellerId, token, { page_size: 100 });
+        setSummary(data.summary);
+        setProducts(data.products.results);
+        setFilteredProducts(data.products.results);
       }
     } catch (err) {
       setError("Failed to load products. Please try again.");
@@ -131,18 +125,6 @@ function SellerPage({ user, onLogout }) {
     setShowForm(true);
   };
 
-  const stats = useMemo(() => {
-    const totalProducts = products.length;
-    const totalStock = products.reduce(
-      (sum, product) => sum + (Number(product.stock) || 0),
-      0
-    );
-    const lowStock = products.filter(
-      (product) => (Number(product.stock) || 0) < 5
-    ).length;
-    return { totalProducts, totalStock, lowStock };
-  }, [products]);
-
   const handleSubmitForm = async (e) => {
     e.preventDefault();
     setFormError(null);
@@ -238,7 +220,12 @@ function SellerPage({ user, onLogout }) {
           <h1>Hi, {sellerName}</h1>
           <p>Control your catalog, pricing, and stock in a single view.</p>
           <div className="seller-hero__meta">
-            <span>{stats.totalProducts} live products</span>
+            <span>{summary?.products ?? 0} live products</span>
+            <span>{summary?.low_stock ?? 0} low on stock</span>
+            <span>
+              Inventory value {formatCurrency(summary?.inventory_value)}
+            </span>
+            <span>{summary?.units_sold ?? 0} units sold</span>
             <span>Updated {new Date().toLocaleTimeString()}</span>
           </div>
         </div>
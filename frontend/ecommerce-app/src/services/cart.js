@@ -79,6 +79,50 @@ export const updateCartItem = async (cartItemId, quantity) => {
   }
 };
 
+// Apply several cart changes in one request.
+// operations: [{ op: "add" | "set" | "remove", product, quantity }]
+export const batchUpdateCart = async (cartId, operations) => {
+  try {
+    const response = await axios.post(
+      `${API_URL}carts/${cartId}/batch/`,
+      {
+        operations,
+      },
+      {
+        headers: authHeaders(),
+      }
+    );
+    return response.data;
+  } catch (error) {
+    console.error("Error updating cart:", error);
+    throw error;
+  }
+};
+
+// Send the full item state the cart should have, plus the version it was
+// read at; only the differences are applied. Resolves to the updated cart,
+// or { unchanged: true, version } when nothing differed. A 409 means the
+// cart changed elsewhere: error.response.data.cart holds the current cart.
+// items: [{ product, quantity }]
+export const syncCart = async (cartId, version, items) => {
+  try {
+    const response = await axios.post(
+      `${API_URL}carts/${cartId}/sync/`,
+      {
+        version,
+        items,
+      },
+      {
+        headers: authHeaders(),
+      }
+    );
+    return response.data;
+  } catch (error) {
+    console.error("Error syncing cart:", error);
+    throw error;
+  }
+};
+
 // Clear entire cart
 export const clearCart = async (cartId) => {
   try {
@@ -110,10 +154,13 @@ export const checkoutCart = async (cartId) => {
   }
 };
 
-export const getCheckoutHistory = async (userId) => {
+// Returns { next, previous, results }; pass the previous page's `next`
+// cursor to load older checkouts
+export const getCheckoutHistory = async (userId, cursor = null) => {
   try {
     const response = await axios.get(`${API_URL}checkouts/user/${userId}/`, {
       headers: authHeaders(),
+      params: cursor ? { cursor } : {},
     });
     return response.data;
   } catch (error) {
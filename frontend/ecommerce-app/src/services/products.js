@@ -2,10 +2,11 @@ import axios from "axios";
 
 const API_URL = "http://localhost:8000/api/products/";
 
-// Fetch all products
-export const getAllProducts = async () => {
+// Fetch a page of products; supports search, seller, min_price/max_price,
+// min_stock/max_stock, ordering, page and page_size params
+export const getAllProducts = async (params = {}) => {
   try {
-    const response = await axios.get(API_URL);
+    const response = await axios.get(API_URL, { params });
     return response.data;
   } catch (error) {
     console.error("Error fetching products:", error);
@@ -16,7 +17,9 @@ export const getAllProducts = async () => {
 // Fetch seller's products
 export const getSellerProducts = async (sellerId) => {
   try {
-    const response = await axios.get(`${API_URL}?seller=${sellerId}`);
+    const response = await axios.get(API_URL, {
+      params: { seller: sellerId, page_size: 100 },
+    });
     return response.data;
   } catch (error) {
     console.error("Error fetching seller products:", error);
@@ -24,6 +27,28 @@ export const getSellerProducts = async (sellerId) => {
   }
 };
 
+// Fetch a seller's dashboard: { summary, low_stock, products } where
+// products is a page of the seller's own products; supports low_stock
+// (threshold), page and page_size params. Only the seller or staff may
+// read it, so it needs their token
+export const getSellerDashboard = async (sellerId, token, params = {}) => {
+  try {
+    const response = await axios.get(
+      `http://localhost:8000/api/sellers/${sellerId}/dashboard/`,
+      {
+        params,
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      }
+    );
+    return response.data;
+  } catch (error) {
+    console.error("Error fetching seller dashboard:", error);
+    throw error;
+  }
+};
+
 // Fetch single product
 export const getProductById = async (productId) => {
   try {